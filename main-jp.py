@@ -5,8 +5,7 @@ import pickle
 import os
 import csv
 import sys
-import itertools
-from collections import defaultdict
+from collections import Counter, defaultdict
 from functools import lru_cache
 
 # ベースマッピング: かなを基本形に変換（濁点・半濁点・小文字を無視）
@@ -156,6 +155,10 @@ def load_wordlist(filename):
     words = [w[1:-1] for w in words]  # クォートを除去
     return words
 
+def word_length(words):
+    """単語リストの単語長を推定（最も多い長さ）"""
+    return Counter(map(len, words)).most_common(1)[0][0] if words else 0
+
 def entropy(probabilities):
     """確率分布のエントロピーを計算"""
     return -sum(p * math.log2(p) for p in probabilities if p > 0)
@@ -163,6 +166,8 @@ def entropy(probabilities):
 class EntropySolver:
     def __init__(self, wordlist_file="wordlist.ts", cache_file="solver_cache.pkl"):
         self.full_list = load_wordlist(wordlist_file)
+        # 単語長は単語リストから推定（フィードバックは1文字につき1桁）
+        self.word_length = word_length(self.full_list)
         self.cache_file = cache_file
         self.candidates = self.full_list.copy()
         self.precomputed_first_guess = None
@@ -285,26 +290,27 @@ class EntropySolver:
         
         return best_guess, best_gain
     
+    def first_guess_partition(self, first_guess):
+        """初手推測のフィードバックごとに回答をグループ化（パターン順）"""
+        pattern_counts = defaultdict(list)
+        for answer in self.full_list:
+            pattern_counts[get_feedback_cached(first_guess, answer)].append(answer)
+        return {feedback: pattern_counts[feedback] for feedback in sorted(pattern_counts)}
+    
     def precompute_second_guesses(self, first_guess):
         """全てのフィードバックパターンに対して第2推測を事前計算"""
         if self.precomputed_second_guesses is None:
             self.precomputed_second_guesses = {}
         
-        # 全フィードバックパターン生成 (4位置×6状態)
-        all_feedbacks = list(itertools.product([0,1,2,3,4,5], repeat=4))
+        # フィードバックパターンごとに回答をグループ化（実際に起こりうるパターンのみ計算）
+        pattern_counts = self.first_guess_partition(first_guess)
+        all_feedbacks = list(pattern_counts)
         total_patterns = len(all_feedbacks)
-        print(f"全フィードバックパターン数: 6^4 = {total_patterns}")
-        
-        # フィードバックパターンごとに回答をグループ化
-        pattern_counts = defaultdict(list)
-        for answer in self.full_list:
-            fb = get_feedback_cached(first_guess, answer)
-            pattern_counts[fb].append(answer)
+        print(f"到達可能なフィードバックパターン数: {total_patterns} (6^{self.word_length} = {6 ** self.word_length}中)")
         
         # 進捗追跡
         computed_count = 0
         skipped_count = 0
-        impossible_count = 0
         
         # 各パターンに対して最適な推測を計算
         for idx, feedback in enumerate(all_feedbacks):
@@ -313,17 +319,8 @@ class EntropySolver:
                 skipped_count += 1
                 continue
                 
-            candidates = pattern_counts.get(feedback, [])
+            candidates = pattern_counts[feedback]
             candidate_count = len(candidates)
-            
-            # 不可能なパターンの処理
-            if candidate_count == 0:
-                self.precomputed_second_guesses[feedback] = (None, 0)
-                impossible_count += 1
-                print(f"  パターン {idx+1}/{total_patterns}: {feedback} (0候補 - 不可能)")
-                self.save_cache()
-                continue
-                
             print(f"  パターン {idx+1}/{total_patterns}: {feedback} ({candidate_count}候補)")
             start_time_pattern = time.time()
             
@@ -342,9 +339,9 @@ class EntropySolver:
         possible_patterns = len([c for c in pattern_counts.values() if c])
         
         print(f"「{first_guess}」の統計:")
-        print(f"- 全パターン数: {total_patterns}")
+        print(f"- 全パターン数: {6 ** self.word_length}")
         print(f"- 可能パターン数: {possible_patterns}")
-        print(f"- 不可能パターン数: {impossible_count}")
+        print(f"- 不可能パターン数: {6 ** self.word_length - possible_patterns}")
         print(f"- 事前計算パターン数: {computed_count}")
         print(f"- スキップパターン数: {skipped_count}")
         
@@ -478,14 +475,14 @@ class EntropySolver:
             print("事前計算済み第2推測が見つかりません")
             self.precompute_second_guesses(first_guess)
         else:
-            # 不足パターンを確認
-            all_feedbacks = list(itertools.product([0,1,2,3,4,5], repeat=4))
+            # 不足パターンを確認（到達可能なパターンのみ）
+            all_feedbacks = self.first_guess_partition(first_guess)
             missing = [fb for fb in all_feedbacks if fb not in self.precomputed_second_guesses]
             if missing:
                 print(f"事前計算済み第2推測に{len(missing)}パターン不足、再計算します...")
                 self.precompute_second_guesses(first_guess)
             else:
-                print("事前計算済み第2推測: 全1296パターン有効")
+                print("事前計算済み第2推測: 到達可能な全パターン有効")
         
         # 初手推測
         print(f"\n=== 第1ラウンド ===")
@@ -499,7 +496,7 @@ class EntropySolver:
             user_guess = first_guess
         
         # 初手推測のフィードバックを取得
-        feedback_str = input("初手推測のフィードバック（4桁）: ").strip()
+        feedback_str = input(f"初手推測のフィードバック（{self.word_length}桁）: ").strip()
         feedback_tuple = self.parse_feedback(feedback_str)
         
         # 候補をフィルタリング
@@ -546,7 +543,7 @@ class EntropySolver:
                 user_guess = user_input
             
             # フィードバックを取得
-            feedback_str = input("フィードバック（4桁）: ").strip()
+            feedback_str = input(f"フィードバック（{self.word_length}桁）: ").strip()
             feedback_tuple = self.parse_feedback(feedback_str)
             
             # 候補をフィルタリング
@@ -581,17 +578,18 @@ class EntropySolver:
     
     def parse_feedback(self, feedback_str):
         """フィードバック文字列をタプルに変換"""
-        if len(feedback_str) != 4 or not feedback_str.isdigit():
-            print("無効なフォーマットです。'0000'を使用します")
-            return (0, 0, 0, 0)
+        if len(feedback_str) != self.word_length or any(d not in "012345" for d in feedback_str):
+            print(f"無効なフォーマットです。'{'0' * self.word_length}'を使用します")
+            return (0,) * self.word_length
         return tuple(int(d) for d in feedback_str)
 
 # ソルバーを実行
 if __name__ == "__main__":
-    print("=== 「言葉で遊ぼう」ソルバー ===")
+    length = word_length(load_wordlist("wordlist.ts"))
+    print(f"=== 「言葉で遊ぼう」ソルバー（{length}文字） ===")
     print("情報理論最適化版")
     print("-------------------------------------")
-    print("フィードバック記号:")
+    print(f"フィードバック記号（1文字につき1桁、計{length}桁）:")
     print("0. 灰色: 単語に含まれない文字")
     print("1. 上下矢印: 同じ行の仮名が同じ位置に存在")
     print("2. 左右矢印: 同じ列の仮名が同じ位置に存在")
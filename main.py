@@ -1,3 +1,4 @@
+import array
 import math
 import re
 import time
@@ -5,11 +6,38 @@ import pickle
 import os
 import csv
 import sys
-import itertools
-from collections import defaultdict
+import json
+import argparse
+import random
+import threading
+import cProfile
+import pstats
+import hashlib
+import socket
+import tempfile
+import multiprocessing
+import concurrent.futures
+import shutil
+import tracemalloc
+import weakref
+from collections import Counter, OrderedDict, defaultdict
 from functools import lru_cache
 import inflect  # For proper pluralization
 
+# NumPy is optional: it enables the vectorised feedback kernel and the worker pool
+try:
+    import numpy as np
+except ImportError:
+    np = None
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Python < 3.8
+    shared_memory = None
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS in the scaling benchmark
+    resource = None
+
 # Create inflection engine for pluralization
 p = inflect.engine()
 
@@ -37,6 +65,63 @@ base_map = {
     'ゎ': 'わ', 'ゕ': 'か', 'ゖ': 'け'
 }
 
+# Without NumPy there is no coverage shortlist: candidate sets up to this size only consider
+# the candidates themselves as guesses, larger sets are searched over the entire dictionary
+FULL_SEARCH_THRESHOLD = 200
+
+# Interactive rounds score the candidates plus as many coverage-shortlisted guesses as fit in
+# this many seconds (never fewer than MIN_SHORTLIST); precompute keeps a fixed number so its
+# results do not depend on machine speed
+SEARCH_BUDGET = 1.0
+MIN_SHORTLIST = 100
+PRECOMPUTE_SHORTLIST = 500
+
+# Two-step lookahead re-ranks this many of the best one-step guesses, for candidate sets
+# up to LOOKAHEAD_MAX_CANDIDATES (larger ones use the one-step search)
+LOOKAHEAD_TOP_K = 10
+LOOKAHEAD_MAX_CANDIDATES = 3000
+
+# Block searches (on a thread pool with --threads) score the guesses in chunks of about this
+# many (guess, candidate) pairs, each chunk a few whole-array NumPy calls
+THREAD_CHUNK_PAIRS = 1 << 17
+# and of at most this many histogram bins (guesses x 6^length, 8 bytes each, sorted per chunk)
+THREAD_CHUNK_BINS = 1 << 20
+# Without --threads, exact stages of at least this many pairs use the same chunked kernel in
+# this thread, smaller ones are scored guess by guess in Python; both keep per-guess histograms
+# that the next round can decrement
+BLOCK_SEARCH_PAIRS = 50000
+
+# --memory-budget (MB): the feedback matrix stays in RAM when it takes at most this share of
+# the budget, otherwise it is memory-mapped from disk or rows are computed on the fly; the
+# caches get CACHE_BUDGET_SHARE of what the matrix leaves
+MATRIX_BUDGET_SHARE = 0.75
+CACHE_BUDGET_SHARE = 0.5
+# Rough sizes of cache entries (bytes), for sizing the caches and the memory report
+LRU_ENTRY_BYTES = 220
+FEEDBACK_ENTRY_BYTES = 90
+PATTERN_ENTRY_BYTES = 400
+HISTOGRAM_ENTRY_BYTES = 100
+# Entries of a solver's feedback LRU without a memory budget
+FEEDBACK_LRU_ENTRIES = 100000
+
+# Filtered candidate lists kept per history prefix by the batch command
+BATCH_PREFIX_CACHE = 10000
+
+# The first-guess scan appends its results to a journal next to the cache at this interval
+# (seconds), so an interrupted precompute resumes where it stopped; the best openers are kept
+# in the cache as a ranked table
+CHECKPOINT_INTERVAL = 60
+OPENER_TABLE_SIZE = 1000
+
+# Fixed opener pairs: the PAIR_TOP_K best single openers are each paired with every other guess,
+# in chunks of PAIR_CHUNK second words, keeping the PAIR_RESULTS best pairs by joint information
+PAIR_TOP_K = 20
+PAIR_RESULTS = 10
+PAIR_CHUNK = 256
+
+# Candidate lists are shown in full up to this size; longer lists show only the most frequent
+DISPLAY_LIMIT = 50
+
 # Row groups (行)
 row_groups = {
     'あ': ['あ', 'い', 'う', 'え', 'お'],
@@ -95,89 +180,1237 @@ def is_variant(a, b):
         return False
     return get_base(a) == get_base(b)
 
+# Integer codes for kana, compiled at import: the kana of the maps, then the rest of the
+# hiragana block and the long-vowel marks, so every process assigns them the same codes.
+# Anything else is registered on first use and behaves like ん/ー; worker processes replay
+# the publishing process's registrations (register_kana) before using its codes.
+KANA_ALPHABET = []
+KANA_CODES = {}
+
+# POSITION_TABLE[guess kana][answer kana] is the positional outcome of a pair:
+# 4 (same kana), 5 (variant), or the row/column result (1, 2 or 0) that stands
+# unless the presence check finds the guessed kana elsewhere in the answer
+POSITION_TABLE = []
+_position_array = None
+
+def _position_outcome(g, a):
+    """Positional outcome of guess kana g against answer kana a, see POSITION_TABLE"""
+    if g == a:
+        return 4
+    if is_variant(g, a):
+        return 5
+    row_g, row_a = get_row(g), get_row(a)
+    if row_g is not None and row_a is not None and row_g == row_a:
+        return 1
+    col_g, col_a = get_col(g), get_col(a)
+    if col_g is not None and col_a is not None and col_g == col_a:
+        return 2
+    return 0
+
+def kana_code(kana):
+    """Integer code of a kana, registering it (and extending POSITION_TABLE) if it is new"""
+    global _position_array
+    code = KANA_CODES.get(kana)
+    if code is None:
+        code = len(KANA_ALPHABET)
+        KANA_ALPHABET.append(kana)
+        KANA_CODES[kana] = code
+        for g, row in zip(KANA_ALPHABET, POSITION_TABLE):
+            row.append(_position_outcome(g, kana))
+        POSITION_TABLE.append([_position_outcome(kana, a) for a in KANA_ALPHABET])
+        _position_array = None
+    return code
+
+def register_kana(alphabet):
+    """Register kana in the order another process did, so its kana codes are valid here"""
+    for kana in alphabet:
+        kana_code(kana)
+    if KANA_ALPHABET[:len(alphabet)] != list(alphabet):
+        raise ValueError("kana codes were assigned in a different order than in the publishing process")
+
+for _kana in list(base_map) + [chr(c) for c in range(0x3041, 0x3097)] + ['ー', '〜', '～', 'ゝ', 'ゞ']:
+    kana_code(_kana)
+
+# Encoded form of each word seen so far: (kana codes, {kana code: count}, POSITION_TABLE rows)
+_encoded_words = {}
+_table_lookup = list.__getitem__
+
+def encode_word(word):
+    """Kana codes, kana count vector and position-table rows of a word, memoised"""
+    entry = _encoded_words.get(word)
+    if entry is None:
+        codes = tuple(kana_code(kana) for kana in word)
+        counts = {}
+        for code in codes:
+            counts[code] = counts.get(code, 0) + 1
+        entry = _encoded_words[word] = (codes, counts, tuple(POSITION_TABLE[code] for code in codes))
+    return entry
+
 def get_feedback(guess, answer):
     """Calculate feedback for a guess compared to the actual answer"""
-    n = len(guess)
-    feedback = [0] * n
-    freq = defaultdict(int)
-    
-    # Create frequency map for answer kanas (excluding exact matches)
-    for k in answer:
-        freq[k] += 1
-
-    # First pass: check for exact matches (4)
-    for i in range(n):
-        if guess[i] == answer[i]:
-            feedback[i] = 4
-            freq[answer[i]] -= 1  # Consume this occurrence
-
-    # Second pass: check for variants at position (5)
-    for i in range(n):
-        if feedback[i] != 0:  # Skip already matched positions
-            continue
-        if is_variant(guess[i], answer[i]):
-            feedback[i] = 5
-
-    # Third pass: check for presence in answer (3)
-    for i in range(n):
-        if feedback[i] != 0:  # Skip already matched positions
+    guess_codes, guess_counts, guess_rows = _encoded_words.get(guess) or encode_word(guess)
+    answer_codes, answer_counts, _ = _encoded_words.get(answer) or encode_word(answer)
+    
+    # Exact matches (4), variants (5) and the row/column fallback in one lookup per position
+    feedback = list(map(_table_lookup, guess_rows, answer_codes))
+    if guess_counts.keys().isdisjoint(answer_counts):
+        return tuple(feedback)
+    
+    # Presence pass (3): only for kana the answer contains, after exact matches are consumed
+    remaining = None
+    for i, code in enumerate(guess_codes):
+        if feedback[i] >= 4 or code not in answer_counts:
             continue
-        if freq.get(guess[i], 0) > 0:
+        if remaining is None:
+            remaining = dict(answer_counts)
+            for j, value in enumerate(feedback):
+                if value == 4:
+                    remaining[answer_codes[j]] -= 1
+        if remaining[code] > 0:
             feedback[i] = 3
-            freq[guess[i]] -= 1  # Consume this occurrence
-
-    # Fourth pass: check for same row (1) or column (2)
-    for i in range(n):
-        if feedback[i] != 0:  # Skip already matched positions
-            continue
-            
-        row_g = get_row(guess[i])
-        row_a = get_row(answer[i])
-        col_g = get_col(guess[i])
-        col_a = get_col(answer[i])
-        
-        if row_g is not None and row_a is not None and row_g == row_a:
-            feedback[i] = 1
-        elif col_g is not None and col_a is not None and col_g == col_a:
-            feedback[i] = 2
-        else:
-            feedback[i] = 0
+            remaining[code] -= 1
     
     return tuple(feedback)
 
-# Caching for feedback calculations
-@lru_cache(maxsize=100000)
+# Caching for feedback calculations: each solver wraps this in its own LRU
+# (EntropySolver.get_feedback_cached), so one solver's memory budget does not size another's
 def get_feedback_cached(guess, answer):
-    """Cached version of get_feedback"""
+    """Cached version of get_feedback, called on LRU misses"""
     return get_feedback(guess, answer)
 
+def feedback_code(feedback):
+    """Pack a feedback tuple into a single base-6 integer"""
+    code = 0
+    for value in feedback:
+        code = code * 6 + value
+    return code
+
+def decode_feedback(code, length):
+    """Unpack a base-6 feedback code back into a feedback tuple"""
+    values = []
+    for _ in range(length):
+        code, value = divmod(code, 6)
+        values.append(value)
+    return tuple(reversed(values))
+
+def histogram_gain(counts, total):
+    """Expected information gain (bits) of a partition given its bucket sizes"""
+    gain = 0
+    for count in counts:
+        if count > 0:
+            p_val = count / total
+            gain += p_val * math.log2(total / count)
+    return gain
+
+# Scoring objectives, higher is better, all computed from a guess's partition histogram:
+# entropy (expected information in bits), minimax (minus the largest group), expected
+# remaining candidates (negated), probability of solving on the next turn, and entropy with
+# freq.csv as the answer prior. The first requested objective is optimised, later ones
+# break its ties.
+OBJECTIVES = ('entropy', 'minimax', 'expected_remaining', 'solve_next', 'freq_entropy')
+WEIGHTED_OBJECTIVES = {'freq_entropy'}
+
+def histogram_scores(counts, objectives, masses=None):
+    """Scores of one partition for each objective, from its group sizes (and prior masses)"""
+    counts = sorted(counts)
+    total = sum(counts)
+    scores = []
+    for name in objectives:
+        if name == 'entropy':
+            scores.append(histogram_gain(counts, total))
+        elif name == 'minimax':
+            scores.append(-counts[-1])
+        elif name == 'expected_remaining':
+            scores.append(-sum(count * count for count in counts) / total)
+        elif name == 'solve_next':
+            scores.append(sum(1 for count in counts if count == 1) / total)
+        elif name == 'freq_entropy':
+            weights = sorted(masses)
+            scores.append(histogram_gain(weights, sum(weights)))
+        else:
+            raise ValueError(f"unknown objective {name!r}")
+    return tuple(scores)
+
+def describe_score(objective, score):
+    """Human-readable form of an objective's score"""
+    if objective == 'minimax':
+        return f"largest group {-score:.0f}"
+    if objective == 'expected_remaining':
+        return f"{-score:.2f} expected remaining"
+    if objective == 'solve_next':
+        return f"{score:.1%} solved next turn"
+    if objective == 'freq_entropy':
+        return f"{score:.4f} frequency-weighted bits"
+    return f"{score:.4f} bits"
+
+def words_digest(words):
+    """Content hash of a word list, used to notice edits to wordlist.ts"""
+    return hashlib.sha1("\n".join(words).encode('utf-8')).hexdigest()
+
+def guess_classes(guesses, candidates, words):
+    """Group guesses that induce exactly the same partition of the candidates.
+    
+    guesses and candidates are index arrays into words. A guess kana that occurs in some
+    candidate is kept as is; any other kana only
+    matters through its positional outcomes (POSITION_TABLE) against the kana the
+    candidates have at that position, so guesses with the same per-position features
+    get identical feedback from every candidate. Returns [representative, class size]
+    pairs, the representative being the first member in guess order.
+    """
+    present = set()
+    columns = None
+    for idx in candidates.tolist():
+        codes, counts, _ = _encoded_words.get(words[idx]) or encode_word(words[idx])
+        present.update(counts)
+        if columns is None:
+            columns = [set() for _ in codes]
+        for column, code in zip(columns, codes):
+            column.add(code)
+    columns = [sorted(column) for column in columns or []]
+    
+    features = {}
+    classes = {}
+    for guess in guesses.tolist():
+        codes = (_encoded_words.get(words[guess]) or encode_word(words[guess]))[0]
+        signature = []
+        for i, code in enumerate(codes):
+            if code in present:
+                signature.append(code)
+                continue
+            feature = features.get((i, code))
+            if feature is None:
+                row = POSITION_TABLE[code]
+                feature = features[(i, code)] = tuple(row[a] for a in columns[i])
+            signature.append(feature)
+        signature = tuple(signature)
+        entry = classes.get(signature)
+        if entry is None:
+            classes[signature] = [guess, 1]
+        else:
+            entry[1] += 1
+    return list(classes.values())
+
+def load_wordlist_arrays(filename):
+    """Load every exported array of a .ts file as {array name: words}"""
+    with open(filename, 'r', encoding='utf-8') as f:
+        content = f.read()
+    arrays = {}
+    for match in re.finditer(r"export\s+const\s+(\w+)[^=\[]*=\s*\[(.*?)\]", content, re.S):
+        words = re.findall(r"'(?:\\.|[^'])*'", match.group(2))
+        arrays[match.group(1)] = [w[1:-1] for w in words]  # Remove quotes
+    return arrays
+
 def load_wordlist(filename):
-    """Load word list from a .ts file"""
+    """Load word list from a .ts file (every exported array, duplicates removed)"""
     with open(filename, 'r', encoding='utf-8') as f:
         content = f.read()
     # Extract words using regex
     words = re.findall(r"'(?:\\.|[^'])*'", content)
     words = [w[1:-1] for w in words]  # Remove quotes
-    return words
+    return list(dict.fromkeys(words))
+
+def word_length(words):
+    """The most common word length in a list (the game's word length)"""
+    lengths = Counter(len(word) for word in words)
+    return lengths.most_common(1)[0][0] if lengths else 0
+
+def load_answer_list(filename, array_name=None):
+    """Load the answer pool from a .ts file.
+    
+    Uses the named export array if given, otherwise the first array other than
+    VALID_GUESSES. A file with a single array is an answer list only when it was
+    passed explicitly (array_name="*"); otherwise None means "every word can be an answer".
+    """
+    arrays = load_wordlist_arrays(filename)
+    if array_name and array_name != '*':
+        if array_name not in arrays:
+            raise ValueError(f"{filename} has no exported array named {array_name}")
+        return arrays[array_name]
+    others = [words for name, words in arrays.items() if name != 'VALID_GUESSES']
+    if len(arrays) >= 2 and others:
+        return others[0]
+    if array_name == '*' and arrays:
+        return next(iter(arrays.values()))
+    return None
+
+def position_array():
+    """POSITION_TABLE as a NumPy array"""
+    global _position_array
+    if _position_array is None:
+        _position_array = np.array(POSITION_TABLE, dtype=np.int8)
+    return _position_array
+
+def encode_words(words):
+    """Encode equal-length words as an (N, length) uint8 array of kana codes"""
+    length = len(words[0]) if words else 0
+    codes = np.empty((len(words), length), dtype=np.uint8)
+    for idx, word in enumerate(words):
+        codes[idx] = [kana_code(kana) for kana in word]
+    return codes
+
+def feedback_code_row(guess, answers):
+    """Feedback codes of one encoded guess against an (N, length) array of encoded answers.
+    
+    Vectorised version of get_feedback followed by feedback_code, using the same position table.
+    """
+    n, length = answers.shape
+    feedback = position_array()[guess, answers]
+    exact = feedback == 4
+    
+    # Presence (3): consume answer kana left over after exact matches, left to right
+    used = {}
+    counts = {}
+    for i in range(length):
+        kana = guess[i]
+        if kana not in used:
+            used[kana] = (exact & (guess == kana)).sum(axis=1)
+            counts[kana] = (answers == kana).sum(axis=1)
+        hit = (feedback[:, i] < 3) & (counts[kana] > used[kana])
+        feedback[hit, i] = 3
+        used[kana] = used[kana] + hit
+    
+    codes = np.zeros(n, dtype=np.int32)
+    for i in range(length):
+        codes = codes * 6 + feedback[:, i]
+    return codes
+
+def feedback_code_block(guesses, answers):
+    """Feedback codes of a (G, length) array of encoded guesses against an (N, length) array of
+    encoded answers, as a (G, N) array; feedback_code_row for many guesses in one go"""
+    count, length = guesses.shape
+    n = len(answers)
+    # Outcomes per position, (length, G, N), so each position is one contiguous block
+    feedback = position_array()[guesses.T[:, :, None], answers.T[:, None, :]]
+    exact = feedback == 4
+    same = guesses[:, :, None] == guesses[:, None, :]
+    copies = np.zeros((n, position_array().shape[0]), dtype=np.int8)
+    for i in range(length):
+        copies[np.arange(n), answers[:, i]] += 1
+    
+    # Presence (3): as in feedback_code_row, each guess position consumes the answer's copies
+    # of its kana left over after the exact matches and the hits at earlier positions
+    hits = []
+    for i in range(length):
+        used = np.zeros((count, n), dtype=np.int8)
+        for j in range(length):
+            used += exact[j] & same[:, i, j, None]
+        for j in range(i):
+            used += hits[j] & same[:, i, j, None]
+        hit = (feedback[i] < 3) & (copies[:, guesses[:, i]].T > used)
+        feedback[i][hit] = 3
+        hits.append(hit)
+    
+    codes = np.zeros((count, n), dtype=np.int64)
+    for i in range(length):
+        codes = codes * 6 + feedback[i]
+    return codes
+
+def sorted_gains(counts, totals):
+    """histogram_gain of each row of an ascending count (or mass) matrix, summed left to right
+    like histogram_gain so the two agree"""
+    totals = np.asarray(totals, dtype=np.float64).reshape(-1, 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        terms = np.where(counts > 0, counts / totals * np.log2(totals / counts), 0.0)
+    return np.cumsum(terms, axis=1)[:, -1]
+
+def block_best_guess(guess_codes, candidate_codes, objectives, weights=None, previous=None, removed_codes=None):
+    """(row, scores, histograms) of the best of a block of encoded guesses against the encoded
+    candidates, the first one on ties; the scores match histogram_scores.
+    
+    The feedback codes, histograms (one bincount over row-offset codes) and scores are whole-array
+    NumPy operations, which release the GIL, so blocks can be scored on several threads. Given the
+    guesses' previous histograms (as from pack_histograms) over a superset of the candidates, only
+    the removed answers are counted and subtracted from them. The histograms are returned packed.
+    """
+    count = len(guess_codes)
+    total = len(candidate_codes)
+    patterns = 6 ** candidate_codes.shape[1]
+    offsets = (np.arange(count) * patterns)[:, None]
+    if previous is None:
+        codes = (feedback_code_block(guess_codes, candidate_codes) + offsets).ravel()
+        histograms = np.bincount(codes, minlength=count * patterns).reshape(count, patterns)
+    else:
+        histograms = np.zeros((count, patterns), dtype=np.int64)
+        for row, (row_patterns, row_counts) in enumerate(previous):
+            histograms[row, row_patterns] = row_counts
+        removed = (feedback_code_block(guess_codes, removed_codes) + offsets).ravel()
+        histograms -= np.bincount(removed, minlength=count * patterns).reshape(count, patterns)
+    counts = np.sort(histograms, axis=1)
+    scores = np.empty((count, len(objectives)))
+    for column, name in enumerate(objectives):
+        if name == 'entropy':
+            scores[:, column] = sorted_gains(counts, total)
+        elif name == 'minimax':
+            scores[:, column] = -counts[:, -1]
+        elif name == 'expected_remaining':
+            scores[:, column] = -(counts * counts).sum(axis=1) / total
+        elif name == 'solve_next':
+            scores[:, column] = (counts == 1).sum(axis=1) / total
+        elif name == 'freq_entropy':
+            masses = np.bincount(codes, weights=np.tile(weights, count), minlength=count * patterns)
+            masses = np.sort(masses.reshape(count, patterns), axis=1)
+            scores[:, column] = sorted_gains(masses, np.cumsum(masses, axis=1)[:, -1])
+        else:
+            raise ValueError(f"unknown objective {name!r}")
+    best_row, best_scores = None, None
+    for row, row_scores in enumerate(map(tuple, scores.tolist())):
+        if best_scores is None or row_scores > best_scores:
+            best_row, best_scores = row, row_scores
+    return best_row, best_scores, pack_histograms(histograms)
+
+def pack_histograms(histograms):
+    """(pattern codes, counts) of the nonzero entries of each row of a (G, patterns) histogram matrix"""
+    rows, patterns = np.nonzero(histograms)
+    counts = histograms[rows, patterns].astype(np.int32)
+    bounds = np.cumsum(np.bincount(rows, minlength=len(histograms)))[:-1]
+    return list(zip(np.split(patterns.astype(np.int32), bounds), np.split(counts, bounds)))
+
+def gain_from_codes(codes, minlength):
+    """Expected information gain and histogram of an array of feedback codes"""
+    counts = np.bincount(codes, minlength=minlength)
+    nonzero = counts[counts > 0]
+    total = codes.size
+    probs = nonzero / total
+    return float(np.sum(probs * np.log2(total / nonzero))), counts
+
+def row_gains(codes):
+    """Expected information gain of every row of a 2-D array of feedback codes"""
+    rows, n = codes.shape
+    ordered = np.sort(codes, axis=1)
+    # Runs of equal codes are the partition's groups; every row starts a new run
+    breaks = np.ones(ordered.shape, dtype=bool)
+    breaks[:, 1:] = ordered[:, 1:] != ordered[:, :-1]
+    starts = np.flatnonzero(breaks.ravel())
+    lengths = np.diff(np.append(starts, ordered.size))
+    sums = np.bincount(starts // n, weights=lengths * np.log2(lengths), minlength=rows)
+    return np.log2(n) - sums / n
+
+def lookahead_values(matrix, rows, bound=-1.0):
+    """Expected information after two guesses for the given first-step rows of a feedback matrix.
+    
+    matrix holds the feedback codes of every guess (rows) against the candidates (columns).
+    Each group of a row's partition is credited with the best gain any row achieves on it,
+    bounded by log2 of its size. Groups are solved largest first and a row is dropped (None)
+    as soon as even perfect splits of its remaining groups could not beat the best value so
+    far. Inner results are memoised on the group's fingerprint, as identical groups recur
+    across first-step guesses. Returns (values, memo hits).
+    """
+    n = matrix.shape[1]
+    memo = {}
+    hits = 0
+    values = []
+    for row in rows:
+        codes = matrix[row]
+        order = np.argsort(codes, kind='stable')
+        ordered = codes[order]
+        groups = np.split(order, np.flatnonzero(ordered[1:] != ordered[:-1]) + 1)
+        groups.sort(key=len, reverse=True)
+        sizes = np.array([len(group) for group in groups])
+        value = float(np.log2(n) - np.sum(sizes * np.log2(sizes)) / n)
+        remaining = float(np.sum(sizes * np.log2(sizes)) / n)
+        for group in groups:
+            size = len(group)
+            if size == 1:
+                break
+            remaining -= size * math.log2(size) / n
+            if size == 2:
+                # Either of the two candidates tells them apart
+                inner = 1.0
+            else:
+                key = group.tobytes()
+                inner = memo.get(key)
+                if inner is None:
+                    inner = memo[key] = float(row_gains(matrix[:, group]).max())
+                else:
+                    hits += 1
+            value += size / n * inner
+            if value + remaining < bound - 1e-12:
+                value = None
+                break
+        values.append(value)
+        if value is not None and value > bound:
+            bound = value
+    return values, hits
+
+def coverage_scores(guess_codes, candidate_codes):
+    """Cheap proxy for the information gain of every encoded guess against encoded candidates.
+    
+    Sums, over positions, the entropy of the outcome (position table, or 3 when the kana
+    occurs elsewhere in the candidate) that each kana would get at that position.
+    """
+    table = position_array()
+    kinds = table.shape[0]
+    n, length = candidate_codes.shape
+    present = np.zeros((kinds, n), dtype=bool)
+    for i in range(length):
+        present[candidate_codes[:, i], np.arange(n)] = True
+    offsets = (np.arange(kinds) * 6)[:, None]
+    scores = np.zeros(len(guess_codes))
+    for i in range(length):
+        outcome = table[:, candidate_codes[:, i]]
+        outcome = np.where((outcome < 4) & present, 3, outcome)
+        counts = np.bincount((outcome + offsets).ravel(), minlength=kinds * 6).reshape(kinds, 6)
+        probs = counts / n
+        terms = np.zeros(probs.shape)
+        np.log2(probs, out=terms, where=counts > 0)
+        scores += -(probs * terms).sum(axis=1)[guess_codes[:, i]]
+    return scores
+
+class BoundedCache:
+    """Dict-like LRU cache kept under max_bytes, with entry sizes estimated by cost(key, value).
+    
+    Used for the solver's caches when a memory budget is set; without one they are plain dicts.
+    """
+    def __init__(self, max_bytes, cost):
+        self.max_bytes = max_bytes
+        self.cost = cost
+        self.bytes = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getitem__(self, key):
+        value, _ = self._entries[key]
+        self._entries.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key in self._entries:
+            self.bytes -= self._entries.pop(key)[1]
+        size = self.cost(key, value)
+        self._entries[key] = (value, size)
+        self.bytes += size
+        # Always keep the newest entry, even if it alone is over the limit
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.bytes = 0
+
+def pattern_entry_cost(key, value):
+    """Estimated bytes of a pattern_cache entry: the candidates key and the histogram"""
+    return PATTERN_ENTRY_BYTES + len(key[1]) + HISTOGRAM_ENTRY_BYTES * len(value)
+
+def cache_bytes(cache, entry_bytes):
+    """Estimated size of a solver cache, exact accounting for a BoundedCache"""
+    if isinstance(cache, BoundedCache):
+        return cache.bytes
+    return len(cache) * entry_bytes
+
+def plan_memory(budget_mb, guesses, answers, length):
+    """Engine and cache limits for a memory budget in MB.
+    
+    Engines, best first: 'matrix' (feedback matrix in RAM), 'mmap' (the matrix memory-mapped
+    from a temporary file, if the disk has room), 'rows' (vectorised rows computed on the fly)
+    and 'python' (get_feedback, when NumPy is missing).
+    """
+    budget = budget_mb * 1024 * 1024
+    plan = {'engine': 'python', 'matrix_bytes': 0}
+    available = budget
+    if np is not None:
+        itemsize = 2 if 6 ** length <= 65536 else 4
+        matrix_bytes = guesses * answers * itemsize
+        plan['matrix_bytes'] = matrix_bytes
+        if matrix_bytes <= MATRIX_BUDGET_SHARE * budget:
+            plan['engine'] = 'matrix'
+            available -= matrix_bytes
+        elif shutil.disk_usage(tempfile.gettempdir()).free > 2 * matrix_bytes:
+            plan['engine'] = 'mmap'
+        else:
+            plan['engine'] = 'rows'
+    caches = max(0, available) * CACHE_BUDGET_SHARE
+    plan['lru_entries'] = max(1024, int(caches * 0.25 / LRU_ENTRY_BYTES))
+    plan['feedback_bytes'] = caches * 0.25
+    plan['pattern_bytes'] = caches * 0.5
+    return plan
+
+class InlinePool:
+    """Stand-in for a worker pool running tasks in this process on the published tables, so the
+    vectorised engines also work without worker processes"""
+    def __init__(self, tables):
+        global _worker_tables
+        self.saved = _worker_tables
+        _worker_tables = tables.arrays
+
+    def apply_async(self, func, args=()):
+        return InlineResult(func, args)
+
+    def imap(self, func, iterable):
+        return map(func, iterable)
+
+    def close(self):
+        global _worker_tables
+        _worker_tables = self.saved
+
+    def join(self):
+        pass
+
+class InlineResult:
+    """Deferred InlinePool task, run when its result is asked for"""
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def get(self):
+        return self.func(*self.args)
+
+class MemoryReport:
+    """Peak memory by component for --memory-report.
+    
+    The Python heap (NumPy arrays included) is traced with tracemalloc and process peaks come
+    from the OS (RSS of this process and of its largest worker). Solver components are
+    estimated from entry counts, sampled on progress events in the solving thread.
+    """
+    def __init__(self, solver, interval=0.5):
+        self.solver = solver
+        self.interval = interval
+        self.peaks = defaultdict(int)
+        self.last_sample = 0
+
+    def start(self):
+        tracemalloc.start()
+        self.solver.progress_callbacks.append(self.on_progress)
+        return self
+
+    def on_progress(self, event, fields):
+        if time.time() - self.last_sample >= self.interval:
+            self.sample()
+
+    def components(self):
+        """Current estimated bytes of each solver component"""
+        solver = self.solver
+        words = len(solver.full_list) + (len(solver.answer_list) if solver.answer_list is not solver.full_list else 0)
+        histogram_entries = lambda histograms: sum(len(counts) for counts in (histograms or {}).values())
+        if solver.round_engine == 'block':
+            round_bytes = sum(patterns.nbytes + counts.nbytes for patterns, counts in solver.round_histograms.values())
+        else:
+            round_bytes = histogram_entries(solver.round_histograms) * HISTOGRAM_ENTRY_BYTES
+        return {
+            'word lists and indexes': words * 300,
+            'feedback LRU': solver.get_feedback_cached.cache_info().currsize * LRU_ENTRY_BYTES,
+            'feedback cache': cache_bytes(solver.feedback_cache, FEEDBACK_ENTRY_BYTES),
+            'pattern cache': cache_bytes(solver.pattern_cache, PATTERN_ENTRY_BYTES),
+            'round histograms': round_bytes,
+            'opener histograms': histogram_entries(solver.guess_histograms) * HISTOGRAM_ENTRY_BYTES,
+            'shared tables (RAM)': solver.table_bytes.get('ram', 0),
+            'shared tables (mapped)': solver.table_bytes.get('mapped', 0),
+        }
+
+    def sample(self):
+        self.last_sample = time.time()
+        for name, size in self.components().items():
+            self.peaks[name] = max(self.peaks[name], size)
+
+    def print_report(self, stage):
+        self.sample()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        mb = 1024 * 1024
+        print(f"Memory report after {stage} (engine: {self.solver.engine}):")
+        for name, size in self.peaks.items():
+            print(f"  {name:<26}{size / mb:>10.1f} MB peak (est.)")
+        print(f"  {'Python heap (tracemalloc)':<26}{traced_peak / mb:>10.1f} MB peak")
+        if resource is not None:
+            scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+            own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+            children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+            print(f"  {'process RSS':<26}{own:>10.1f} MB peak")
+            if children:
+                print(f"  {'largest worker RSS':<26}{children:>10.1f} MB peak")
+        print("  Largest live allocations:")
+        for stat in tracemalloc.take_snapshot().statistics('lineno')[:5]:
+            frame = stat.traceback[0]
+            print(f"    {os.path.basename(frame.filename)}:{frame.lineno:<6}{stat.size / mb:>8.1f} MB "
+                  f"in {p.no('block', stat.count)}")
+
+class SharedTables:
+    """Read-only NumPy tables published once for worker processes.
+    
+    Arrays live in multiprocessing.shared_memory blocks (backend 'shm') or in .npy files
+    opened with mmap (backend 'mmap'), so every worker maps the same pages instead of
+    receiving a pickled copy. describe() gives the small picklable handle workers attach with.
+    """
+    def __init__(self, backend='shm', directory=None):
+        if backend == 'shm' and shared_memory is None:
+            backend = 'mmap'
+        self.backend = backend
+        self.directory = directory
+        self.arrays = {}
+        self._entries = {}
+        self._blocks = []
+        self._adopted = set()
+
+    def publish(self, name, array):
+        """Copy an array into shared storage, returns the shared view"""
+        array = np.ascontiguousarray(array)
+        view = self.allocate(name, array.shape, array.dtype)
+        view[...] = array
+        return view
+
+    def allocate(self, name, shape, dtype):
+        """Create an uninitialised shared array to be filled in place (no private copy first)"""
+        dtype = np.dtype(dtype)
+        if self.backend == 'shm':
+            block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * dtype.itemsize))
+            view = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+            self._blocks.append(block)
+            location = block.name
+        else:
+            if self.directory is None:
+                self.directory = tempfile.mkdtemp(prefix="solver_tables_")
+            location = os.path.join(self.directory, f"{name}.npy")
+            view = np.lib.format.open_memmap(location, mode='w+', dtype=dtype, shape=shape)
+        self.arrays[name] = view
+        self._entries[name] = (self.backend, location, tuple(shape), dtype.str)
+        return view
+
+    def adopt(self, name, path):
+        """Publish an existing .npy file (such as a build artifact) memory-mapped; it is left in
+        place on close"""
+        view = np.load(path, mmap_mode='r')
+        self.arrays[name] = view
+        self._entries[name] = ('mmap', path, tuple(view.shape), view.dtype.str)
+        self._adopted.add(name)
+        return view
+    
+    def describe(self):
+        return dict(self._entries)
+
+    @staticmethod
+    def attach(description):
+        """Map published tables as read-only views, returns ({name: array}, handles to keep alive)"""
+        arrays, handles = {}, []
+        for name, (backend, location, shape, dtype) in description.items():
+            if backend == 'shm':
+                # Pool workers share the creator's resource tracker, so the block is
+                # unlinked exactly once, by close() in the publishing process
+                block = shared_memory.SharedMemory(name=location)
+                view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+                handles.append(block)
+            else:
+                view = np.load(location, mmap_mode='r')
+            view.flags.writeable = False
+            arrays[name] = view
+        return arrays, handles
+
+    def close(self):
+        """Release and remove the published tables"""
+        self.arrays.clear()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+        if self.backend == 'mmap' and self.directory:
+            for name, (_, location, _, _) in self._entries.items():
+                if name not in self._adopted and os.path.exists(location):
+                    os.remove(location)
+
+# Tables attached by pool worker processes
+_worker_tables = {}
+_worker_handles = []
+
+def _attach_worker_tables(description):
+    """Pool initializer: map the shared tables into this worker"""
+    global _worker_tables, _worker_handles
+    _worker_tables, _worker_handles = SharedTables.attach(description)
+    if 'kana_alphabet' in _worker_tables:
+        register_kana(_worker_tables['kana_alphabet'].tolist())
+
+def _worker_feedback_codes(guess_idx, answer_idx=None):
+    """Feedback codes of one guess against the answers (or a subset), from the shared tables"""
+    matrix = _worker_tables.get('feedback_matrix')
+    if matrix is not None:
+        row = matrix[guess_idx]
+        return row if answer_idx is None else row[answer_idx]
+    answers = _worker_tables['answer_codes']
+    if answer_idx is not None:
+        answers = answers[answer_idx]
+    return feedback_code_row(_worker_tables['guess_codes'][guess_idx], answers).astype(np.int32)
+
+def _worker_histogram(codes, answer_idx=None):
+    """Partition histogram {code: count} of feedback codes, and {code: prior mass} when
+    answer weights are published (else None)"""
+    counts = np.bincount(codes)
+    nonzero = np.flatnonzero(counts)
+    histogram = dict(zip(nonzero.tolist(), counts[nonzero].tolist()))
+    weights = _worker_tables.get('answer_weights')
+    if weights is None:
+        return histogram, None
+    if answer_idx is not None:
+        weights = weights[answer_idx]
+    masses = np.bincount(codes, weights=weights)
+    return histogram, dict(zip(nonzero.tolist(), masses[nonzero].tolist()))
+
+def _worker_opener_chunk(chunk):
+    """Partition histograms (and prior masses) of a chunk of guesses against every answer;
+    chunk is (position of the first, guess indices)"""
+    start, guess_rows = chunk
+    return start, [_worker_histogram(_worker_feedback_codes(guess_idx)) for guess_idx in guess_rows]
+
+def _worker_best_guess(answer_idx, guess_idx, objectives=('entropy',)):
+    """Best guess (index, scores) among guess_idx for the candidate answers answer_idx"""
+    answer_idx = np.asarray(answer_idx)
+    best_idx, best_scores = None, None
+    for idx in guess_idx:
+        histogram, masses = _worker_histogram(_worker_feedback_codes(idx, answer_idx), answer_idx)
+        scores = histogram_scores(histogram.values(), objectives, masses and masses.values())
+        if best_scores is None or scores > best_scores:
+            best_idx, best_scores = idx, scores
+    return best_idx, best_scores
+
+def _worker_feedback_rows(guess_idx, answer_idx):
+    """Feedback code rows of several guesses against the candidate answers answer_idx"""
+    answer_idx = np.asarray(answer_idx)
+    return np.array([_worker_feedback_codes(idx, answer_idx) for idx in guess_idx])
+
+def _worker_lookahead(description, rows):
+    """lookahead_values for some first-step rows of a shared lookahead matrix"""
+    arrays, handles = SharedTables.attach(description)
+    try:
+        return lookahead_values(arrays['lookahead'], rows)
+    finally:
+        arrays.clear()
+        for block in handles:
+            block.close()
+
+def _worker_pair_chunk(first_idx, first_gains, guess_idx, gains, threshold):
+    """Joint information of the opener pairs (first, g): every first word in first_idx (best first)
+    with each guess g in guess_idx (given by falling information) that comes after it in the
+    ranking, skipping pairs whose bound H(first) + H(g) is below threshold.
+    
+    Returns [(joint information, first position, g)] of the pairs scored. Each word's partition is
+    computed once per chunk and renumbered densely, so the joint codes stay small.
+    """
+    firsts = [np.unique(_worker_feedback_codes(idx), return_inverse=True)[1] for idx in first_idx]
+    results = []
+    for idx, gain in zip(guess_idx, gains):
+        if first_gains[0] + gain < threshold:
+            break
+        groups, second = np.unique(_worker_feedback_codes(idx), return_inverse=True)
+        for position, (first, first_gain) in enumerate(zip(firsts, first_gains)):
+            if first_idx[position] == idx:
+                # Pairs with a later first word were scored from the other side
+                break
+            if first_gain + gain < threshold:
+                break
+            results.append((gain_from_codes(first * len(groups) + second, 0)[0], position, idx))
+    return results
 
 def entropy(probabilities):
     """Calculate entropy of a probability distribution"""
     return -sum(p * math.log2(p) for p in probabilities if p > 0)
 
+class JsonLinesSink:
+    """Metrics sink appending events and snapshots as JSON lines"""
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'a', encoding='utf-8')
+
+    def write_event(self, record):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self.file.flush()
+
+    def write_snapshot(self, snapshot):
+        self.write_event(dict(snapshot, event='snapshot'))
+
+    def close(self):
+        self.file.close()
+
+class PrometheusTextfileSink:
+    """Metrics sink rewriting a Prometheus textfile (node_exporter format) on every flush"""
+    def __init__(self, path, prefix="kotobade_solver"):
+        self.path = path
+        self.prefix = prefix
+
+    def write_event(self, record):
+        pass  # Only snapshots are exported
+
+    def write_snapshot(self, snapshot):
+        lines = []
+        # Counters carry the _total suffix Prometheus expects of them
+        for section, kind, suffix in (('counters', 'counter', '_total'), ('gauges', 'gauge', '')):
+            for name, value in sorted(snapshot[section].items()):
+                metric = f"{self.prefix}_{name}{suffix}"
+                lines.append(f"# TYPE {metric} {kind}")
+                lines.append(f"{metric} {value}")
+        for name, summary in sorted(snapshot['summaries'].items()):
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{metric}_count {summary['count']}")
+            lines.append(f"{metric}_sum {summary['sum']}")
+        # Write atomically so the exporter never reads a half-written file
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        os.replace(tmp_path, self.path)
+
+    def close(self):
+        pass
+
+class Metrics:
+    """Counters, gauges and timing summaries for precompute and play, with pluggable sinks"""
+    def __init__(self, sinks=None):
+        self.counters = defaultdict(int)
+        self.gauges = {}
+        self.summaries = {}
+        self.sinks = list(sinks or [])
+        # Feedback LRUs of the solvers reporting here, for the cache statistics
+        self.feedback_lrus = []
+
+    def incr(self, name, value=1):
+        self.counters[name] += value
+
+    def track_lru(self, cache):
+        """Include a solver's feedback LRU in the snapshots"""
+        self.feedback_lrus.append(cache)
+
+    def set_gauge(self, name, value):
+        self.gauges[name] = value
+
+    def observe(self, name, value):
+        """Record one observation of a timing or size summary"""
+        summary = self.summaries.get(name)
+        if summary is None:
+            self.summaries[name] = {'count': 1, 'sum': value, 'min': value, 'max': value}
+        else:
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['min'] = min(summary['min'], value)
+            summary['max'] = max(summary['max'], value)
+
+    def event(self, name, **fields):
+        """Send a structured event to every sink"""
+        if not self.sinks:
+            return
+        record = {'ts': round(time.time(), 3), 'event': name}
+        record.update(fields)
+        for sink in self.sinks:
+            sink.write_event(record)
+
+    def snapshot(self):
+        """Current values, including the hit rates of the feedback caches"""
+        counters = dict(self.counters)
+        gauges = dict(self.gauges)
+        infos = [cache.cache_info() for cache in self.feedback_lrus]
+        counters['feedback_computations'] = sum(info.misses for info in infos)
+        counters['feedback_lru_hits'] = sum(info.hits for info in infos)
+        counters['feedback_lru_misses'] = sum(info.misses for info in infos)
+        gauges['feedback_lru_size'] = sum(info.currsize for info in infos)
+        for cache in ('feedback_lru', 'feedback_cache', 'pattern_cache'):
+            hits = counters.get(f"{cache}_hits", 0)
+            lookups = hits + counters.get(f"{cache}_misses", 0)
+            gauges[f"{cache}_hit_rate"] = hits / lookups if lookups else 0.0
+        return {
+            'counters': counters,
+            'gauges': gauges,
+            'summaries': {name: dict(s) for name, s in self.summaries.items()}
+        }
+
+    def flush(self):
+        """Write a snapshot to every sink"""
+        if not self.sinks:
+            return
+        snapshot = self.snapshot()
+        for sink in self.sinks:
+            sink.write_snapshot(snapshot)
+
+    def close(self):
+        self.flush()
+        for sink in self.sinks:
+            sink.close()
+
+def console_progress(event, fields, file=None):
+    """Default progress callback: prints the solver's progress messages to the console (or file)"""
+    if event == 'words_ignored':
+        print(f"Ignoring {p.no('word', fields['count'])} not {fields['length']} kana long", file=file)
+    elif event == 'frequency_loaded':
+        print(f"Loaded frequency data for {p.no('word', fields['words'])}", file=file)
+    elif event == 'frequency_error':
+        print(f"Error loading frequency data: {fields['error']}", file=file)
+    elif event == 'frequency_missing':
+        print(f"Frequency file {fields['file']} not found. Using alphabetical sorting.", file=file)
+    elif event == 'cache_first_guess':
+        print(f"Loaded precomputed first guess: {fields['guess']} "
+              f"({describe_score(fields['objective'], fields['gain'])})", file=file)
+    elif event == 'cache_second_guesses':
+        print(f"Loaded precomputed second guesses for {fields['patterns']} feedback patterns", file=file)
+    elif event == 'cache_error':
+        print(f"Error loading cache: {fields['error']}", file=file)
+    elif event == 'histograms_error':
+        print(f"Error loading partition histograms: {fields['error']}", file=file)
+    elif event == 'wordlist_recompute':
+        if fields['reason'] == 'weighted':
+            print("Word list changed, recomputing the frequency-weighted tables", file=file)
+        else:
+            print("Cache was built for a different answer list, recomputing", file=file)
+    elif event == 'first_guess_start':
+        if fields['answers'] != fields['total']:
+            print(f"Precomputing optimal first guess over {p.no('word', fields['total'])} against "
+                  f"{p.no('answer', fields['answers'])} (this may take several minutes)...", file=file)
+        else:
+            print(f"Precomputing optimal first guess over {p.no('word', fields['total'])} (this may take several minutes)...", file=file)
+    elif event == 'first_guess_resumed':
+        print(f"Resuming first guess scan at {p.no('word', fields['processed'])} of "
+              f"{p.no('word', fields['total'])}, best so far {fields['guess']} "
+              f"({describe_score(fields['objective'], fields['gain'])})", file=file)
+    elif event == 'first_guess_new_best':
+        print(f"  New best: {fields['guess']} ({describe_score(fields['objective'], fields['gain'])})", file=file)
+    elif event == 'first_guess_progress':
+        print(f"  Processed {p.no('word', fields['processed'])} of {p.no('word', fields['total'])} ({fields['percent']:.1f}%) - "
+              f"Elapsed: {fields['elapsed']:.0f}s, Remaining: ~{fields['remaining']:.0f}s, "
+              f"Speed: {fields['speed']:.1f} words/sec", file=file)
+        # Print current best even if it hasn't changed
+        if fields['best_guess']:
+            print(f"    Current best: {fields['best_guess']} ({describe_score(fields['objective'], fields['best_gain'])})", file=file)
+    elif event == 'first_guess_done':
+        print(f"Precomputation completed in {fields['elapsed']:.1f} seconds", file=file)
+        print(f"Optimal first guess: {fields['guess']} ({describe_score(fields['objective'], fields['gain'])})", file=file)
+    elif event == 'second_guess_start':
+        print(f"Reachable feedback patterns: {fields['total']} of 6^{fields['length']} = {fields['patterns']}", file=file)
+    elif event == 'second_guess_pattern':
+        if fields['candidates'] == 0:
+            print(f"  Pattern {fields['index']}/{fields['total']}: {fields['feedback']} (0 candidates - impossible)", file=file)
+        else:
+            print(f"  Pattern {fields['index']}/{fields['total']}: {fields['feedback']} ({fields['candidates']} candidates)", file=file)
+    elif event == 'second_guess_result':
+        print(f"    Best second guess: {fields['guess']} ({describe_score(fields['objective'], fields['gain'])}) "
+              f"- computed in {fields['elapsed']:.2f} seconds", file=file)
+    elif event == 'second_guess_done':
+        print(f"Summary for '{fields['first_guess']}':", file=file)
+        print(f"- Total patterns: {fields['total']}", file=file)
+        print(f"- Possible patterns: {fields['possible']}", file=file)
+        print(f"- Impossible patterns: {fields['impossible']}", file=file)
+        print(f"- Precomputed: {fields['computed']} patterns", file=file)
+        print(f"- Skipped (already computed): {fields['skipped']} patterns", file=file)
+        print(f"Second guess precomputation completed in {fields['elapsed']:.1f} seconds", file=file)
+    elif event == 'wordlist_changes':
+        print(f"Word list changed: {p.no('word', fields['added'])} added, {p.no('word', fields['removed'])} removed "
+              f"- updating partition histograms incrementally...", file=file)
+    elif event == 'wordlist_opener_changed':
+        print(f"Optimal first guess changed from {fields['old']} to {fields['new']} "
+              f"({describe_score(fields['objective'], fields['gain'])}), "
+              f"recomputing second guesses", file=file)
+    elif event == 'wordlist_update_done':
+        print(f"Incremental update completed in {fields['elapsed']:.1f} seconds "
+              f"(first guess: {fields['guess']}, {p.no('second-guess pattern', fields['stale'])} recomputed)", file=file)
+    elif event == 'search_start':
+        shortlisted = ""
+        if fields['candidates'] < fields['total'] < fields['dictionary']:
+            shortlisted = f" shortlisted from {p.no('word', fields['dictionary'])}"
+        if fields['classes'] < fields['total']:
+            print(f"    Evaluating {p.no('potential guess', fields['total'])}{shortlisted} "
+                  f"({p.no('distinct partition', fields['classes'])} on these candidates)...", file=file)
+        else:
+            print(f"    Evaluating {p.no('potential guess', fields['total'])}{shortlisted}...", file=file)
+    elif event == 'lookahead_start':
+        print(f"    Looking two guesses ahead from the best {fields['top_k']} of "
+              f"{p.no('potential guess', fields['total'])}...", file=file)
+    elif event == 'lookahead_done':
+        if fields['guess'] != fields['greedy']:
+            print(f"    Two-step search prefers {fields['guess']} over {fields['greedy']} "
+                  f"({fields['elapsed']:.2f} seconds)", file=file)
+        else:
+            print(f"    Two-step search agrees with the one-step choice ({fields['elapsed']:.2f} seconds)", file=file)
+    elif event == 'search_progress':
+        print(f"      Processed {p.no('guess', fields['processed'])} of {p.no('guess', fields['total'])} "
+              f"({fields['percent']:.1f}%) - Elapsed: {fields['elapsed']:.1f}s", file=file)
+    elif event == 'search_done':
+        print(f"    Evaluated {p.no('guess', fields['total'])} in {fields['elapsed']:.2f} seconds", file=file)
+    elif event == 'pair_search_start':
+        print(f"Pairing the best {p.no('opener', fields['firsts'])} with {p.no('word', fields['total'])} "
+              f"against {p.no('answer', fields['answers'])}...", file=file)
+    elif event == 'pair_search_progress':
+        print(f"  Second words: {fields['processed']} of {fields['total']}, {p.no('pair', fields['scored'])} scored "
+              f"- best so far {fields['first']} + {fields['second']} ({fields['bits']:.4f} bits), "
+              f"elapsed {fields['elapsed']:.0f}s", file=file)
+    elif event == 'pair_search_done':
+        print(f"Pair search scored {p.no('pair', fields['scored'])} of {fields['possible']} "
+              f"in {fields['elapsed']:.1f} seconds", file=file)
+
+# Word list and cache status events, the part of the console output batch mode keeps (on stderr)
+STATUS_EVENTS = {'words_ignored', 'frequency_loaded', 'frequency_error', 'frequency_missing',
+                 'cache_first_guess', 'cache_second_guesses', 'cache_error', 'histograms_error',
+                 'wordlist_recompute'}
+
+def stderr_status(event, fields):
+    """Progress callback printing only the status events, to stderr so stdout stays free for results"""
+    if event in STATUS_EVENTS:
+        console_progress(event, fields, file=sys.stderr)
+
 class EntropySolver:
-    def __init__(self, wordlist_file="wordlist.ts", cache_file="solver_cache.pkl"):
-        self.full_list = load_wordlist(wordlist_file)
+    def __init__(self, wordlist_file="wordlist.ts", cache_file="solver_cache.pkl", metrics=None, progress=None,
+                 words=None, answers=None, answer_min_freq=None, workers=1, shared_backend='shm',
+                 feedback_matrix=False, search_budget=SEARCH_BUDGET, shortlist=PRECOMPUTE_SHORTLIST,
+                 lookahead=0, objective='entropy', checkpoint_interval=CHECKPOINT_INTERVAL,
+                 memory_budget=None, hard_mode=False, threads=None, matrix_file=None):
+        self.metrics = metrics if metrics is not None else Metrics()
+        # Progress callbacks receive (event, fields); defaults to console output
+        self.progress_callbacks = list(progress) if progress is not None else [console_progress]
+        # An explicit word list (e.g. a sampled subset) takes precedence over the wordlist file
+        self.full_list = list(words) if words is not None else load_wordlist(wordlist_file)
+        # Words of another length than most of the list cannot be played and are dropped
+        self.word_length = word_length(self.full_list)
+        self.pattern_count = 6 ** self.word_length
+        other_lengths = [word for word in self.full_list if len(word) != self.word_length]
+        if other_lengths:
+            self.report('words_ignored', count=len(other_lengths), length=self.word_length)
+            self.full_list = [word for word in self.full_list if len(word) == self.word_length]
+        self.frequency_dict = self.load_frequency_data("freq.csv")
+        # Possible answers: an explicit list, a frequency cutoff, a second export array
+        # in the wordlist file, or (by default) every allowed guess
+        if answers is None and answer_min_freq is not None:
+            answers = [w for w in self.full_list if self.frequency_dict.get(w, 0) >= answer_min_freq]
+        if answers is None and words is None:
+            answers = load_answer_list(wordlist_file)
+        if answers is None:
+            self.answer_list = self.full_list
+        else:
+            self.answer_list = [word for word in dict.fromkeys(answers) if len(word) == self.word_length]
+            # Every answer must also be a valid guess
+            known = set(self.full_list)
+            self.full_list.extend(a for a in self.answer_list if a not in known)
+            if self.answer_list == self.full_list:
+                self.answer_list = self.full_list
+        self.guess_index = {word: idx for idx, word in enumerate(self.full_list)}
+        self.guess_codes = None
+        # Candidates and guess sets are int32 arrays of word indices (array('i') without NumPy);
+        # words are only looked up again for display and output
+        self.all_guesses = self.index_array(range(len(self.full_list)))
+        self.answer_indices = self.word_indices(self.answer_list)
+        # Frequencies and the display order (most frequent first, then kana order) by word index,
+        # computed once so sorting candidates is a rank lookup
+        frequencies = [self.frequency_dict.get(word, 0) for word in self.full_list]
+        order = sorted(range(len(self.full_list)), key=lambda idx: (-frequencies[idx], self.full_list[idx]))
+        if np is not None:
+            self.frequencies = np.array(frequencies, dtype=np.float64)
+            self.frequency_rank = np.empty(len(order), dtype=np.int32)
+            self.frequency_rank[order] = np.arange(len(order), dtype=np.int32)
+        else:
+            self.frequencies = frequencies
+            self.frequency_rank = [0] * len(order)
+            for rank, idx in enumerate(order):
+                self.frequency_rank[idx] = rank
+        # Interactive searches fit the shortlist to search_budget seconds (None: whole dictionary),
+        # using the measured seconds per (guess, candidate) pair of earlier searches
+        self.search_budget = search_budget or None
+        self.pair_seconds = 4e-6
+        # Precompute keeps a fixed shortlist (0: whole dictionary)
+        self.precompute_shortlist = shortlist or len(self.full_list)
+        # Hard mode: every guess must fit all feedback so far, so only the candidates are scored
+        # (the opener among the answers); its tables are cached apart from the normal ones
+        self.hard_mode = hard_mode
+        self.opener_list = self.answer_list if hard_mode else self.full_list
+        # Re-rank this many one-step guesses two guesses deep during play (0: one-step only);
+        # the second step may play any word, so not in hard mode
+        self.lookahead = lookahead if np is not None and not hard_mode else 0
+        self.lookahead_pool = None
+        # Threads scoring interactive searches (needs NumPy; 0: one per core, None: sequential)
+        self.threads = (threads or os.cpu_count() or 1) if threads is not None and np is not None else None
+        self.thread_pool = None
+        # Row of each answer in the answer tables, by word index (-1 for guess-only words)
+        self.answer_row = [-1] * len(self.full_list)
+        for row, idx in enumerate(self.answer_indices):
+            self.answer_row[idx] = row
+        if np is not None:
+            self.answer_row = np.array(self.answer_row, dtype=np.int32)
+        # Worker processes for precompute (needs NumPy), sharing tables instead of copies
+        self.workers = workers if np is not None else 1
+        self.shared_backend = shared_backend
+        self.use_feedback_matrix = feedback_matrix
+        # Precompute engine: without a memory budget, vectorised rows (or the shared matrix) in
+        # worker processes, else pure Python; with one, the fastest engine that fits it
+        self.memory_plan = None
+        if memory_budget:
+            self.memory_plan = plan_memory(memory_budget, len(self.full_list), len(self.answer_list),
+                                           self.word_length)
+            self.engine = self.memory_plan['engine']
+            self.use_feedback_matrix = self.engine in ('matrix', 'mmap')
+            if self.use_feedback_matrix:
+                self.shared_backend = 'mmap' if self.engine == 'mmap' else 'shm'
+        elif self.workers > 1:
+            self.engine = ('mmap' if shared_backend == 'mmap' else 'matrix') if feedback_matrix else 'rows'
+        else:
+            self.engine = 'python'
+        # This solver's own feedback LRU, sized to the memory budget if there is one
+        lru_entries = self.memory_plan['lru_entries'] if self.memory_plan else FEEDBACK_LRU_ENTRIES
+        self.get_feedback_cached = lru_cache(maxsize=lru_entries)(get_feedback_cached)
+        self.metrics.track_lru(self.get_feedback_cached)
+        # A prebuilt feedback matrix (.npy, guesses x answers) is mapped instead of computed
+        self.matrix_file = matrix_file if np is not None else None
+        if self.matrix_file:
+            self.engine = 'mmap'
+            self.use_feedback_matrix = True
+        self.vectorised = self.engine != 'python'
+        # Tables published for worker pools, built on first use and shared by every later pool
+        self.shared_tables = None
+        self._tables_finalizer = None
+        # Bytes of the tables currently published, in RAM and memory-mapped, for the memory report
+        self.table_bytes = {}
+        self.memory_report = None
+        # Objectives to optimise, the first deciding and the rest breaking ties; caches are kept
+        # per objective list (tag), plain entropy under the original keys
+        self.objectives = tuple(objective.split(',')) if isinstance(objective, str) else tuple(objective)
+        self.objective = self.objectives[0]
+        self.objective_tag = ','.join(self.objectives)
+        self.cache_tag = 'hard:' + self.objective_tag if hard_mode else self.objective_tag
+        self.weighted = bool(WEIGHTED_OBJECTIVES.intersection(self.objectives))
+        self.cache_data = {}
         self.cache_file = cache_file
-        self.candidates = self.full_list.copy()
+        cache_prefix = os.path.splitext(cache_file)[0] + ("_hard" if hard_mode else "") if cache_file else None
+        # Per-guess partition histograms over the answers, kept next to the cache for incremental updates
+        self.histogram_file = cache_prefix + "_histograms.pkl" if cache_file else None
+        self.guess_histograms = None
+        # Journal of the first-guess scan's finished guesses, written every checkpoint_interval seconds
+        self.checkpoint_file = cache_prefix + "_opener.ckpt" if cache_file else None
+        self.checkpoint_interval = checkpoint_interval
+        # Best openers as (guess, primary score), best first, and the best fixed opener pairs
+        # found by a build ({'top_k', 'count', 'pairs': [(first, second, bits)]} or None)
+        self.opener_table = []
+        self.opener_pairs = None
+        self.wordlist_digest = None
+        self.answers_digest = None
+        self.candidates = self.answer_indices
         self.precomputed_first_guess = None
         self.precomputed_second_guesses = None
-        self.feedback_cache = {}
-        self.pattern_cache = {}
-        self.frequency_dict = self.load_frequency_data("freq.csv")
+        # Answers grouped by feedback for each cached opener, {opener: {feedback code: answer indices}}
+        self.opener_partitions = {}
+        if self.memory_plan:
+            self.feedback_cache = BoundedCache(self.memory_plan['feedback_bytes'],
+                                               lambda key, value: FEEDBACK_ENTRY_BYTES)
+            self.pattern_cache = BoundedCache(self.memory_plan['pattern_bytes'], pattern_entry_cost)
+        else:
+            self.feedback_cache = {}
+            self.pattern_cache = {}
+        # [representative, class size] pairs and {objective: score} of the last find_best_guess
+        self.last_guess_classes = []
+        self.last_scores = {}
+        # Candidates and per-guess feedback histograms of the last find_best_guess, so the
+        # next round can subtract the filtered-out answers instead of rebuilding. The engine that
+        # made them ('python': {feedback: count} dicts, 'block': packed NumPy rows) keeps them up
+        self.round_candidates = self.index_array(())
+        self.round_histograms = {}
+        self.round_engine = None
         
         # Try to load precomputed first and second guesses
         self.load_cache()
     
+    def answer_prior(self, word):
+        """Prior weight of an answer for frequency-weighted objectives (add-one smoothed)"""
+        return self.frequency_dict.get(word, 0) + 1
+    
+    def report(self, event, **fields):
+        """Send a progress event to the metrics sinks and every progress callback"""
+        self.metrics.event(event, **fields)
+        for callback in self.progress_callbacks:
+            callback(event, fields)
+    
     def load_frequency_data(self, filename):
         """Load word frequency data from a CSV file"""
         frequency_dict = {}
@@ -192,273 +1425,1065 @@ class EntropySolver:
                             frequency_dict[word] = frequency
                         except (KeyError, ValueError):
                             continue
-                print(f"Loaded frequency data for {p.no('word', len(frequency_dict))}")
+                self.report('frequency_loaded', words=len(frequency_dict))
             except Exception as e:
-                print(f"Error loading frequency data: {e}")
+                self.report('frequency_error', error=str(e))
         else:
-            print(f"Frequency file {filename} not found. Using alphabetical sorting.")
+            self.report('frequency_missing', file=filename)
         return frequency_dict
     
     def load_cache(self):
         """Load precomputed data if available"""
-        if os.path.exists(self.cache_file):
+        if self.cache_file and os.path.exists(self.cache_file):
             try:
                 with open(self.cache_file, 'rb') as f:
-                    cache_data = pickle.load(f)
+                    self.cache_data = pickle.load(f)
+                    cache_data = self.cache_data
+                    if self.cache_tag != 'entropy':
+                        cache_data = cache_data.get('objectives', {}).get(self.cache_tag, {})
                     self.precomputed_first_guess = cache_data.get('first_guess')
                     self.precomputed_second_guesses = cache_data.get('second_guesses')
+                    self.opener_table = cache_data.get('opener_table', [])
+                    self.opener_pairs = cache_data.get('opener_pairs')
+                    self.wordlist_digest = cache_data.get('wordlist_digest')
+                    # Caches from before separate answer lists were built with every word as an answer
+                    self.answers_digest = cache_data.get('answers_digest', self.wordlist_digest)
+                    # Opener partitions index the answer list they were built for
+                    if self.answers_digest == words_digest(self.answer_list):
+                        self.opener_partitions = cache_data.get('opener_partitions', {})
                     
                     if self.precomputed_first_guess:
                         guess, gain = self.precomputed_first_guess
-                        print(f"Loaded precomputed first guess: {guess} ({gain:.4f} bits)")
+                        self.report('cache_first_guess', guess=guess, gain=gain, objective=self.objective)
                     
                     if self.precomputed_second_guesses:
-                        print(f"Loaded precomputed second guesses for {len(self.precomputed_second_guesses)} feedback patterns")
+                        self.report('cache_second_guesses', patterns=len(self.precomputed_second_guesses))
             except Exception as e:
-                print(f"Error loading cache: {e}")
+                self.report('cache_error', error=str(e))
                 self.precomputed_first_guess = None
                 self.precomputed_second_guesses = None
     
     def save_cache(self):
         """Save precomputed data for future runs"""
-        cache_data = {
+        if not self.cache_file:
+            return
+        tables = {
             'first_guess': self.precomputed_first_guess,
-            'second_guesses': self.precomputed_second_guesses
+            'second_guesses': self.precomputed_second_guesses,
+            'opener_table': self.opener_table,
+            'opener_partitions': self.opener_partitions,
+            'opener_pairs': self.opener_pairs,
+            'wordlist_digest': words_digest(self.full_list),
+            'answers_digest': words_digest(self.answer_list)
         }
+        # Tables of the other objectives (and of hard mode) in the file are kept as they are
+        cache_data = dict(self.cache_data)
+        if self.cache_tag == 'entropy':
+            cache_data.update(tables)
+        else:
+            cache_data['objectives'] = dict(cache_data.get('objectives', {}), **{self.cache_tag: tables})
+        self.cache_data = cache_data
         with open(self.cache_file, 'wb') as f:
             pickle.dump(cache_data, f)
     
+    def load_histograms(self):
+        """Load the partition histogram store, or None if there is none"""
+        if not self.histogram_file or not os.path.exists(self.histogram_file):
+            return None
+        try:
+            with open(self.histogram_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            self.report('histograms_error', error=str(e))
+            return None
+    
+    def save_histograms(self):
+        """Save each guess's partition histogram over the answers"""
+        if not self.histogram_file or self.guess_histograms is None:
+            return
+        store = {
+            'guesses': self.opener_list,
+            'answers': self.answer_list,
+            'histograms': self.guess_histograms
+        }
+        tmp_path = self.histogram_file + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(store, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.histogram_file)
+    
+    def checkpoint_header(self):
+        """First journal record: what the scan is over, so a journal for other lists is ignored"""
+        return {'wordlist_digest': words_digest(self.full_list),
+                'answers_digest': words_digest(self.answer_list),
+                'objective': self.cache_tag}
+    
+    def load_checkpoint(self):
+        """(scores, histograms) of the guesses a previous scan finished, in guess order, from the
+        journal; empty lists if there is none or it belongs to other word lists"""
+        if not self.checkpoint_file or not os.path.exists(self.checkpoint_file):
+            return [], []
+        scores, histograms = [], []
+        with open(self.checkpoint_file, 'rb') as f:
+            try:
+                if pickle.load(f) != self.checkpoint_header():
+                    return [], []
+                while True:
+                    record = pickle.load(f)
+                    scores.extend(record['scores'])
+                    histograms.extend(record['histograms'])
+            except (EOFError, pickle.UnpicklingError):
+                # End of the journal, or a record cut short by the interruption
+                pass
+        return scores, histograms
+    
+    def write_checkpoint(self, scores, histograms, start):
+        """Append the results of guesses [start, len(scores)) to the journal"""
+        if not self.checkpoint_file or start >= len(scores):
+            return
+        mode = 'ab' if start else 'wb'
+        with open(self.checkpoint_file, mode) as f:
+            if not start:
+                pickle.dump(self.checkpoint_header(), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump({'scores': scores[start:], 'histograms': histograms[start:]}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+    
+    def rank_openers(self, scores):
+        """Keep the OPENER_TABLE_SIZE best of (guess, scores) pairs as the ranked opener table"""
+        ranked = sorted(scores, key=lambda item: item[1], reverse=True)[:OPENER_TABLE_SIZE]
+        self.opener_table = [(guess, guess_scores[0]) for guess, guess_scores in ranked]
+    
+    def guess_histogram(self, guess, answers, masses=None):
+        """Partition histogram {feedback code: count} of a guess over the answers; a dict passed
+        as masses is filled with each pattern's summed answer priors"""
+        counts = defaultdict(int)
+        for answer in answers:
+            fb = self.get_feedback_cached(guess, answer)
+            counts[fb] += 1
+            if masses is not None:
+                masses[fb] = masses.get(fb, 0) + self.answer_prior(answer)
+        return {feedback_code(fb): count for fb, count in counts.items()}
+    
+    def sync_wordlist(self):
+        """Update histograms, first guess and affected second guesses after wordlist.ts changed.
+        
+        Only the changed words are scored: new guesses against all answers, and every
+        guess against the added or removed answers. Returns True if anything was updated.
+        """
+        answers_digest = words_digest(self.answer_list)
+        if self.wordlist_digest == words_digest(self.full_list) and self.answers_digest == answers_digest:
+            return False
+        guesses = self.opener_list
+        answers = self.answer_list
+        store = self.load_histograms()
+        if store is not None:
+            old_guesses = set(store['guesses'])
+            old_answers = set(store['answers'])
+            histograms = store['histograms']
+            if store['guesses'] == guesses and store['answers'] == answers:
+                self.guess_histograms = histograms
+                return False
+            guess_set = set(guesses)
+            answer_set = set(answers)
+            added_guesses = [g for g in guesses if g not in old_guesses]
+            removed_guesses = [g for g in store['guesses'] if g not in guess_set]
+            added_answers = [a for a in answers if a not in old_answers]
+            removed_answers = [a for a in store['answers'] if a not in answer_set]
+        
+        # Without histograms, or when most of the answers changed, a full precompute is cheaper.
+        # The stored histograms hold plain counts without the answers' prior masses, so
+        # prior-weighted objectives always recompute
+        if self.weighted:
+            if self.precomputed_first_guess or self.precomputed_second_guesses:
+                self.report('wordlist_recompute', reason='weighted')
+                self.precomputed_first_guess = None
+                self.precomputed_second_guesses = None
+            return False
+        if store is None or len(added_answers) + len(removed_answers) > len(answers) // 2:
+            if self.answers_digest is None:
+                # Legacy cache: every word was an answer
+                other_answers = answers is not guesses
+            else:
+                other_answers = self.answers_digest != answers_digest
+            if other_answers and (self.precomputed_first_guess or self.precomputed_second_guesses):
+                self.report('wordlist_recompute', reason='answers')
+                self.precomputed_first_guess = None
+                self.precomputed_second_guesses = None
+            return False
+        
+        self.report('wordlist_changes', added=len(added_guesses), removed=len(removed_guesses))
+        start_time = time.time()
+        
+        # Adjust the surviving guesses' histograms by the changed answers only
+        for guess in removed_guesses:
+            histograms.pop(guess, None)
+        for guess, counts in histograms.items():
+            for answer in removed_answers:
+                code = feedback_code(self.get_feedback_cached(guess, answer))
+                counts[code] -= 1
+                if counts[code] == 0:
+                    del counts[code]
+            for answer in added_answers:
+                code = feedback_code(self.get_feedback_cached(guess, answer))
+                counts[code] = counts.get(code, 0) + 1
+        for guess in added_guesses:
+            histograms[guess] = self.guess_histogram(guess, answers)
+        self.guess_histograms = histograms
+        self.metrics.incr('guesses_evaluated', len(added_guesses))
+        
+        # The opener is just the best histogram
+        best_guess, best_scores = None, None
+        ranking = []
+        for guess in guesses:
+            scores = histogram_scores(histograms[guess].values(), self.objectives)
+            ranking.append((guess, scores))
+            if best_scores is None or scores > best_scores:
+                best_guess, best_scores = guess, scores
+        best_gain = best_scores[0]
+        self.rank_openers(ranking)
+        old_first = self.precomputed_first_guess[0] if self.precomputed_first_guess else None
+        self.precomputed_first_guess = (best_guess, best_gain)
+        
+        stale = []
+        if best_guess != old_first or not self.precomputed_second_guesses:
+            if old_first:
+                self.report('wordlist_opener_changed', old=old_first, new=best_guess, gain=best_gain,
+                            objective=self.objective)
+            self.precomputed_second_guesses = {}
+        else:
+            stale = self.stale_second_guesses(best_guess, added_answers + removed_answers,
+                                              added_guesses, removed_guesses)
+            for feedback in stale:
+                del self.precomputed_second_guesses[feedback]
+        self.save_histograms()
+        self.save_cache()
+        self.precompute_second_guesses(best_guess)
+        
+        self.wordlist_digest = words_digest(self.full_list)
+        self.answers_digest = answers_digest
+        self.report('wordlist_update_done', guess=best_guess, gain=best_gain, stale=len(stale),
+                    elapsed=time.time() - start_time)
+        return True
+    
+    def stale_second_guesses(self, first_guess, changed_answers, added_guesses, removed_guesses):
+        """Feedback patterns whose cached second guess no longer holds after a word list edit.
+        
+        A pattern is stale if its group of answers changed or its cached guess was removed.
+        For unchanged groups, words that newly enter the group's shortlist (added words, or words
+        moving up after removals) are scored directly and replace the cached guess in place when
+        they do better.
+        """
+        changed = {self.get_feedback_cached(first_guess, answer) for answer in changed_answers}
+        removed = set(removed_guesses)
+        groups = defaultdict(list)
+        for idx, answer in zip(self.answer_indices.tolist(), self.answer_list):
+            groups[self.get_feedback_cached(first_guess, answer)].append(idx)
+        added = set(added_guesses)
+        old_guesses = [guess for guess in self.full_list if guess not in added] + list(removed_guesses)
+        old_index = {guess: idx for idx, guess in enumerate(old_guesses)}
+        old_codes = encode_words(old_guesses) if np is not None else None
+        keep = self.precompute_shortlist
+        
+        stale = []
+        for feedback, (cached_guess, cached_gain) in list(self.precomputed_second_guesses.items()):
+            group = self.index_array(groups.get(feedback, ()))
+            if feedback in changed or cached_guess in removed:
+                stale.append(feedback)
+            elif cached_guess and len(group) > 1 and (added_guesses or removed_guesses):
+                # The shortlist the cached guess was chosen from, over the old word list
+                old_group = self.index_array(old_index[self.full_list[idx]] for idx in group.tolist())
+                if old_codes is not None:
+                    old_rows = self.select_guesses(old_group, keep, old_codes).tolist()
+                elif keep + len(group) >= len(old_guesses):
+                    old_rows = range(len(old_guesses))
+                else:
+                    # Without NumPy only the candidates are searched, the same ones as now
+                    old_rows = old_group.tolist()
+                old_shortlist = {old_guesses[row] for row in old_rows}
+                entered = [guess for guess in self.select_guesses(group, keep).tolist()
+                           if self.full_list[guess] not in old_shortlist]
+                cached_idx = self.guess_index[cached_guess]
+                cached_scores = self.guess_scores(cached_idx, group) if entered else None
+                for guess in sorted(entered):
+                    scores = self.guess_scores(guess, group)
+                    if scores > cached_scores or (scores == cached_scores and guess < cached_idx):
+                        cached_idx, cached_scores = guess, scores
+                cached_guess = self.full_list[cached_idx]
+                if cached_scores:
+                    self.precomputed_second_guesses[feedback] = (cached_guess, cached_scores[0])
+        return stale
+    
     def precompute_first_guess(self):
         """Precompute the optimal first guess and save to cache"""
         if self.precomputed_first_guess:
             return self.precomputed_first_guess
-            
-        total_words = len(self.full_list)
-        print(f"Precomputing optimal first guess over {p.no('word', total_words)} (this may take several minutes)...")
+        
+        best_guess, best_gain = self.find_best_opener()
+        self.precomputed_first_guess = (best_guess, best_gain)
+        
+        # Precompute second guesses now that we have the first guess
+        self.precompute_second_guesses(best_guess)
+        
+        return best_guess, best_gain
+    
+    def find_best_opener(self):
+        """Scan every allowed guess (every answer in hard mode) against the answer list and return
+        the best (guess, gain).
+        
+        Finished guesses are journalled every checkpoint_interval seconds (and when the scan is
+        interrupted), and a later call continues after the last journalled guess.
+        """
+        total_words = len(self.opener_list)
+        total_answers = len(self.answer_list)
+        self.report('first_guess_start', total=total_words, answers=total_answers)
         start_time = time.time()
         last_print_time = start_time
         
+        # Per-guess scores and histograms in guess order, starting with any journalled ones
+        all_scores, all_histograms = self.load_checkpoint()
+        resumed = len(all_scores)
         best_guess = None
-        best_gain = -1
+        best_scores = None
+        best_gain = None
+        for idx, scores in enumerate(all_scores):
+            if best_scores is None or scores > best_scores:
+                best_guess, best_scores, best_gain = self.opener_list[idx], scores, scores[0]
+        if resumed:
+            self.report('first_guess_resumed', processed=resumed, total=total_words, guess=best_guess,
+                        gain=best_gain, objective=self.objective)
+        checkpointed = resumed
+        last_checkpoint_time = start_time
         
-        for idx, guess in enumerate(self.full_list):
+        try:
+            for idx, guess, histogram, masses in self.opener_histograms(resumed):
+                # Keep the partition histogram so word list edits can be applied incrementally
+                all_histograms.append(histogram)
+                scores = histogram_scores(histogram.values(), self.objectives, masses and masses.values())
+                all_scores.append(scores)
+                    
+                # Update best guess if we found a better one
+                if best_scores is None or scores > best_scores:
+                    best_scores = scores
+                    best_gain = scores[0]
+                    best_guess = guess
+                    self.report('first_guess_new_best', guess=best_guess, gain=best_gain, index=idx,
+                                objective=self.objective)
+                
+                current_time = time.time()
+                if self.checkpoint_interval and current_time - last_checkpoint_time >= self.checkpoint_interval:
+                    self.write_checkpoint(all_scores, all_histograms, checkpointed)
+                    checkpointed = len(all_scores)
+                    last_checkpoint_time = current_time
+                
+                # Report progress every 2 seconds
+                if current_time - last_print_time >= 2:
+                    elapsed = current_time - start_time
+                    percent_complete = (idx + 1) / total_words * 100
+                    words_per_sec = (idx + 1 - resumed) / elapsed
+                    est_remaining = (total_words - idx - 1) / words_per_sec
+                
+                    self.metrics.set_gauge('first_guess_guesses_per_second', words_per_sec)
+                    self.metrics.set_gauge('first_guess_processed', idx + 1)
+                    self.report('first_guess_progress', processed=idx + 1, total=total_words,
+                                percent=percent_complete, elapsed=elapsed, remaining=est_remaining,
+                                speed=words_per_sec, best_guess=best_guess, best_gain=best_gain,
+                                objective=self.objective)
+                    self.metrics.flush()
+                    
+                    last_print_time = current_time
+        finally:
+            # Keep what was done since the last checkpoint when the scan stops early
+            if len(all_scores) < total_words:
+                self.write_checkpoint(all_scores, all_histograms, checkpointed)
+        
+        elapsed = time.time() - start_time
+        scanned = total_words - resumed
+        self.metrics.incr('guesses_evaluated', scanned)
+        self.metrics.observe('first_guess_seconds', elapsed)
+        if elapsed > 0:
+            self.metrics.set_gauge('first_guess_guesses_per_second', scanned / elapsed)
+        self.report('first_guess_done', guess=best_guess, gain=best_gain, elapsed=elapsed,
+                    objective=self.objective)
+        self.metrics.flush()
+        
+        self.rank_openers(zip(self.opener_list, all_scores))
+        self.guess_histograms = dict(zip(self.opener_list, all_histograms))
+        self.save_histograms()
+        if self.checkpoint_file and os.path.exists(self.checkpoint_file):
+            os.remove(self.checkpoint_file)
+        return best_guess, best_gain
+    
+    def opener_histograms(self, first=0):
+        """Yield (index, guess, histogram, prior masses or None) for every opener candidate from
+        index first against every answer, in order"""
+        guesses = self.opener_list
+        if self.vectorised:
+            pool, _ = self.open_worker_pool()
+            try:
+                chunk = max(1, min(200, len(guesses) // (self.workers * 8)))
+                chunks = [(start, [self.guess_index[guess] for guess in guesses[start:start + chunk]])
+                          for start in range(first, len(guesses), chunk)]
+                for start, results in pool.imap(_worker_opener_chunk, chunks):
+                    for offset, (histogram, masses) in enumerate(results):
+                        yield start + offset, guesses[start + offset], histogram, masses
+            finally:
+                self.close_worker_pool(pool)
+            return
+        
+        for idx in range(first, len(guesses)):
+            guess = guesses[idx]
             pattern_counts = defaultdict(int)
+            pattern_masses = defaultdict(float) if self.weighted else None
             
-            for answer in self.full_list:
-                fb = get_feedback_cached(guess, answer)
+            for answer in self.answer_list:
+                fb = self.get_feedback_cached(guess, answer)
                 pattern_counts[fb] += 1
-                
-            gain = 0
-            total = total_words
-            for count in pattern_counts.values():
-                if count > 0:
-                    p_val = count / total
-                    gain += p_val * math.log2(total / count)
-                
-            # Update best guess if we found a better one
-            if gain > best_gain:
-                best_gain = gain
-                best_guess = guess
-                print(f"  New best: {best_guess} ({gain:.4f} bits)")
+                if pattern_masses is not None:
+                    pattern_masses[fb] += self.answer_prior(answer)
             
-            # Print progress every 2 seconds
-            current_time = time.time()
-            if current_time - last_print_time >= 2:
-                elapsed = current_time - start_time
-                percent_complete = (idx + 1) / total_words * 100
-                words_per_sec = (idx + 1) / elapsed
-                est_total_time = total_words / words_per_sec
-                est_remaining = est_total_time - elapsed
-                
-                print(f"  Processed {p.no('word', idx+1)} of {p.no('word', total_words)} ({percent_complete:.1f}%) - "
-                      f"Elapsed: {elapsed:.0f}s, Remaining: ~{est_remaining:.0f}s, "
-                      f"Speed: {words_per_sec:.1f} words/sec")
-                
-                # Print current best even if it hasn't changed
-                if best_guess:
-                    print(f"    Current best: {best_guess} ({best_gain:.4f} bits)")
+            histogram = {feedback_code(fb): count for fb, count in pattern_counts.items()}
+            yield idx, guess, histogram, pattern_masses
+    
+    def single_gains(self):
+        """Information (bits) of every opener candidate against the answers, from the first-guess
+        scan's partition histograms (scanning if there are none)"""
+        if self.guess_histograms is None:
+            store = self.load_histograms()
+            if store and store['guesses'] == self.opener_list and store['answers'] == self.answer_list:
+                self.guess_histograms = store['histograms']
+            else:
+                self.find_best_opener()
+        total = len(self.answer_list)
+        return {guess: histogram_gain(sorted(self.guess_histograms[guess].values()), total)
+                for guess in self.opener_list}
+    
+    def find_opener_pairs(self, top_k=PAIR_TOP_K, count=PAIR_RESULTS):
+        """Best fixed two-word openers by joint information, [(first, second, bits)] best first.
+        
+        Each of the top_k single openers is paired with every guess ranked below it, the second
+        words taken in chunks by falling information so each chunk's feedback rows are computed
+        once for all first words. H(first, second) <= H(first) + H(second), so pairs whose bound
+        is below the count-th best pair so far are skipped, and the search ends once no first
+        word can reach it; chunks run on the worker pool in waves, tightening the bound between
+        waves. Pairs are reported once, with the better single opener first.
+        """
+        gains = self.single_gains()
+        ranked = sorted(self.opener_list, key=lambda guess: -gains[guess])
+        firsts = ranked[:top_k]
+        first_idx = [self.guess_index[guess] for guess in firsts]
+        first_gains = [gains[guess] for guess in firsts]
+        seconds = ranked[1:]
+        chunks = [seconds[start:start + PAIR_CHUNK] for start in range(0, len(seconds), PAIR_CHUNK)]
+        possible = sum(len(ranked) - rank - 1 for rank in range(len(firsts)))
+        self.report('pair_search_start', firsts=len(firsts), total=len(ranked), answers=len(self.answer_list))
+        start_time = time.time()
+        last_print_time = start_time
+        best = []
+        scored = 0
+        processed = 0
+        pool, _ = self.open_worker_pool()
+        try:
+            while processed < len(chunks):
+                # Bound slightly loosened so rounding never skips a pair that ties
+                threshold = best[count - 1][0] - 1e-9 if len(best) >= count else -1.0
+                if first_gains[0] + gains[chunks[processed][0]] < threshold:
+                    break
+                wave = chunks[processed:processed + 2 * max(1, self.workers)]
+                tasks = [pool.apply_async(_worker_pair_chunk,
+                                          (first_idx, first_gains, [self.guess_index[guess] for guess in chunk],
+                                           [gains[guess] for guess in chunk], threshold))
+                         for chunk in wave]
+                for task in tasks:
+                    results = task.get()
+                    scored += len(results)
+                    best.extend((bits, position, self.full_list[idx]) for bits, position, idx in results)
+                # Ties keep the pair with the better first word, then the earlier second word
+                best = sorted(best, key=lambda pair: (-pair[0], pair[1]))[:count]
+                processed += len(wave)
                 
-                last_print_time = current_time
+                current_time = time.time()
+                if current_time - last_print_time >= 2:
+                    self.report('pair_search_progress', processed=min(processed * PAIR_CHUNK, len(seconds)),
+                                total=len(seconds), scored=scored, elapsed=current_time - start_time,
+                                first=firsts[best[0][1]], second=best[0][2], bits=best[0][0])
+                    last_print_time = current_time
+        finally:
+            self.close_worker_pool(pool)
         
-        self.precomputed_first_guess = (best_guess, best_gain)
-        print(f"Precomputation completed in {time.time() - start_time:.1f} seconds")
-        print(f"Optimal first guess: {best_guess} ({best_gain:.4f} bits)")
+        elapsed = time.time() - start_time
+        self.metrics.incr('pairs_evaluated', scored)
+        self.metrics.incr('pairs_pruned', possible - scored)
+        self.metrics.observe('pair_search_seconds', elapsed)
+        self.report('pair_search_done', scored=scored, possible=possible, elapsed=elapsed)
+        self.metrics.flush()
+        return [(firsts[position], second, bits) for bits, position, second in best]
+    
+    def publish_tables(self):
+        """Publish encoded words, frequencies and optionally the feedback matrix for worker processes.
+        They are published once per solver and reused by every pool until release_tables()."""
+        if self.shared_tables is not None:
+            return self.shared_tables
+        tables = SharedTables(self.shared_backend)
+        guess_codes = tables.publish('guess_codes', self.encoded_guesses())
+        # The kana the codes refer to, in code order, for workers to register first
+        tables.publish('kana_alphabet', np.array(KANA_ALPHABET))
+        answer_codes = tables.publish('answer_codes', guess_codes[self.answer_indices])
+        tables.publish('frequencies', self.frequencies)
+        if self.weighted:
+            tables.publish('answer_weights', np.array([self.answer_prior(a) for a in self.answer_list],
+                                                      dtype=np.float64))
+        if self.matrix_file:
+            tables.adopt('feedback_matrix', self.matrix_file)
+        elif self.use_feedback_matrix:
+            # Filled in place, so only one copy of the matrix ever exists
+            dtype = np.uint16 if 6 ** guess_codes.shape[1] <= 65536 else np.int32
+            matrix = tables.allocate('feedback_matrix', (len(guess_codes), len(answer_codes)), dtype)
+            self.build_feedback_matrix(guess_codes, answer_codes, matrix)
+        size = sum(array.nbytes for array in tables.arrays.values())
+        self.table_bytes = {'mapped' if tables.backend == 'mmap' else 'ram': size}
+        self.shared_tables = tables
+        # Shared memory blocks and table files are removed at exit if release_tables() is never called
+        self._tables_finalizer = weakref.finalize(self, tables.close)
+        return tables
+    
+    def release_tables(self):
+        """Remove the published tables"""
+        if self._tables_finalizer is not None:
+            self._tables_finalizer()
+            self._tables_finalizer = None
+        self.shared_tables = None
+        self.table_bytes = {}
+    
+    def build_feedback_matrix(self, guess_codes, answer_codes, matrix):
+        """Fill matrix with the feedback codes of every guess (rows) against every answer (columns)"""
+        for idx in range(len(guess_codes)):
+            matrix[idx] = feedback_code_row(guess_codes[idx], answer_codes)
+        if isinstance(matrix, np.memmap):
+            matrix.flush()
+        return matrix
+    
+    def open_worker_pool(self):
+        """Start worker processes attached to the published tables, returns (pool, tables).
+        With a single worker the tasks run in this process instead."""
+        tables = self.publish_tables()
+        if self.workers <= 1:
+            return InlinePool(tables), tables
+        context = multiprocessing.get_context('spawn')
+        pool = context.Pool(self.workers, initializer=_attach_worker_tables, initargs=(tables.describe(),))
+        return pool, tables
+    
+    def close_worker_pool(self, pool):
+        pool.close()
+        pool.join()
+    
+    def solve_patterns(self, work, total):
+        """Yield (feedback, candidates, best guess, gain, seconds) for each (index, feedback, candidates)
+        of the total patterns"""
+        if self.vectorised and work:
+            pool, _ = self.open_worker_pool()
+            try:
+                tasks = []
+                for idx, feedback, candidates in work:
+                    if len(candidates) == 1:
+                        # Same shortcut as find_best_guess: a lone candidate is the answer
+                        tasks.append(None)
+                        continue
+                    answer_rows = self.answer_row[candidates].tolist()
+                    guess_set = self.select_guesses(candidates, self.precompute_shortlist)
+                    guess_rows = [guess for guess, _ in guess_classes(guess_set, candidates, self.full_list)]
+                    tasks.append(pool.apply_async(_worker_best_guess, (answer_rows, guess_rows, self.objectives)))
+                start_time = time.time()
+                for (idx, feedback, candidates), task in zip(work, tasks):
+                    guess_row, scores = task.get() if task else (candidates[0], (0,))
+                    gain = scores[0]
+                    self.report('second_guess_pattern', index=idx + 1, total=total,
+                                feedback=feedback, candidates=len(candidates))
+                    elapsed = time.time() - start_time
+                    start_time = time.time()
+                    yield feedback, candidates, self.full_list[guess_row], gain, elapsed
+            finally:
+                self.close_worker_pool(pool)
+            return
         
-        # Precompute second guesses now that we have the first guess
-        self.precompute_second_guesses(best_guess)
+        for idx, feedback, candidates in work:
+            self.report('second_guess_pattern', index=idx + 1, total=total,
+                        feedback=feedback, candidates=len(candidates))
+            start_time_pattern = time.time()
+            
+            # Clear caches to free memory before each pattern
+            self.pattern_cache.clear()
+            self.feedback_cache.clear()
+            
+            # Compute best guess
+            best_guess, gain = self.find_best_guess(candidates, self.precompute_shortlist)
+            yield feedback, candidates, best_guess, gain, time.time() - start_time_pattern
+    
+    def opener_groups(self, first_guess):
+        """Answer indices grouped by their feedback to the first guess, {feedback code: indices} in
+        pattern order; built once per opener and kept in the cache"""
+        groups = self.opener_partitions.get(first_guess)
+        if groups is None:
+            indices = defaultdict(list)
+            for idx, answer in enumerate(self.answer_list):
+                indices[feedback_code(self.get_feedback_cached(first_guess, answer))].append(idx)
+            groups = {code: array.array('i', indices[code]) for code in sorted(indices)}
+            self.opener_partitions[first_guess] = groups
+        return groups
+    
+    def answer_candidates(self, rows):
+        """Word indices of the answers at the given answer-list rows"""
+        if np is None:
+            return array.array('i', [self.answer_indices[row] for row in rows])
+        return self.answer_indices[np.asarray(rows, dtype=np.int32)]
+    
+    def first_guess_partition(self, first_guess):
+        """Answers grouped by their feedback to the first guess, {feedback: word indices} in pattern order.
         
-        return best_guess, best_gain
+        Only these reachable patterns (at most one per answer, far fewer than 6^length) need a
+        second guess; any other feedback means the answer is not in the list.
+        """
+        return {decode_feedback(code, self.word_length): self.answer_candidates(group)
+                for code, group in self.opener_groups(first_guess).items()}
+    
+    def opener_candidates(self, guess, feedback):
+        """Answers left after the first guess, looked up in its cached partition, or None if the
+        guess has none"""
+        groups = self.opener_partitions.get(guess)
+        if groups is None:
+            return None
+        return self.answer_candidates(groups.get(feedback_code(feedback), ()))
+    
+    def missing_second_guesses(self, first_guess):
+        """Reachable feedback patterns of the first guess without a cached second guess"""
+        cached = self.precomputed_second_guesses or {}
+        patterns = (decode_feedback(code, self.word_length) for code in self.opener_groups(first_guess))
+        return [feedback for feedback in patterns if feedback not in cached]
     
     def precompute_second_guesses(self, first_guess):
-        """Precompute optimal second guesses for all 1296 possible feedback patterns"""
+        """Precompute optimal second guesses for every feedback pattern the first guess can get"""
         if self.precomputed_second_guesses is None:
             self.precomputed_second_guesses = {}
         
         # Start timer for the entire precomputation
         start_time_total = time.time()
         
-        # Generate all possible feedback patterns (0-5 for each of 4 positions)
-        all_feedbacks = list(itertools.product([0,1,2,3,4,5], repeat=4))
-        total_patterns = len(all_feedbacks)
-        print(f"Total possible feedback patterns: 6^4 = {total_patterns}")
-        
         # Group answers by actual feedback pattern
-        pattern_counts = defaultdict(list)
-        for answer in self.full_list:
-            fb = get_feedback_cached(first_guess, answer)
-            pattern_counts[fb].append(answer)
+        pattern_counts = self.first_guess_partition(first_guess)
+        total_patterns = len(pattern_counts)
+        self.report('second_guess_start', first_guess=first_guess, total=total_patterns,
+                    patterns=self.pattern_count, length=self.word_length)
         
         # Initialize progress tracking
         computed_count = 0
         skipped_count = 0
-        impossible_count = 0
         
-        # Compute best guess for each pattern
-        for idx, feedback in enumerate(all_feedbacks):
+        # Collect the patterns that still need a best guess
+        work = []
+        for idx, (feedback, candidates) in enumerate(pattern_counts.items()):
             # Skip if already computed
             if feedback in self.precomputed_second_guesses:
                 skipped_count += 1
                 continue
-                
-            candidates = pattern_counts.get(feedback, [])
-            candidate_count = len(candidates)
-            
-            # Handle impossible patterns
-            if candidate_count == 0:
-                self.precomputed_second_guesses[feedback] = (None, 0)
-                impossible_count += 1
-                print(f"  Pattern {idx+1}/{total_patterns}: {feedback} (0 candidates - impossible)")
-                # Save immediately after processing this pattern
-                self.save_cache()
-                continue
-                
-            print(f"  Pattern {idx+1}/{total_patterns}: {feedback} ({candidate_count} candidates)")
-            start_time_pattern = time.time()
-            
-            # Clear caches to free memory before each pattern
-            self.pattern_cache.clear()
-            self.feedback_cache.clear()
-            
-            # Compute best guess
-            best_guess, gain = self.find_best_guess(candidates)
-            elapsed_pattern = time.time() - start_time_pattern
-
+            work.append((idx, feedback, candidates))
+        
+        # Compute best guess for each pattern
+        for feedback, candidates, best_guess, gain, elapsed_pattern in self.solve_patterns(work, total_patterns):
             self.precomputed_second_guesses[feedback] = (best_guess, gain)
             computed_count += 1
-            print(f"    Best second guess: {best_guess} ({gain:.4f} bits) - computed in {elapsed_pattern:.2f} seconds")
+            self.metrics.observe('second_guess_pattern_seconds', elapsed_pattern)
+            self.report('second_guess_result', feedback=feedback, guess=best_guess, gain=gain,
+                        objective=self.objective, elapsed=elapsed_pattern, candidates=len(candidates))
             
             # Save immediately after processing this pattern
             self.save_cache()
-        
-        # Count statistics
-        possible_patterns = len([c for c in pattern_counts.values() if c])
-        
-        print(f"Summary for '{first_guess}':")
-        print(f"- Total patterns: {total_patterns}")
-        print(f"- Possible patterns: {possible_patterns}")
-        print(f"- Impossible patterns: {impossible_count}")
-        print(f"- Precomputed: {computed_count} patterns")
-        print(f"- Skipped (already computed): {skipped_count} patterns")
+            self.metrics.flush()
         
         elapsed_total = time.time() - start_time_total
-        print(f"Second guess precomputation completed in {elapsed_total:.1f} seconds")
+        self.report('second_guess_done', first_guess=first_guess, total=self.pattern_count,
+                    possible=total_patterns, impossible=self.pattern_count - total_patterns,
+                    computed=computed_count, skipped=skipped_count, elapsed=elapsed_total)
+        self.metrics.flush()
     
-    def expected_information_gain(self, guess, candidates):
-        """Calculate expected information gain for a guess"""
+    def guess_scores(self, guess, candidates):
+        """Scores of a guess (word index) against the candidates for each of the solver's objectives"""
+        masses = None
+        if self.weighted:
+            masses = defaultdict(float)
+            feedback = self.get_feedback_cached
+            for answer in candidates.tolist():
+                masses[feedback(self.full_list[guess], self.full_list[answer])] += self.frequencies[answer] + 1
+            masses = masses.values()
+        return histogram_scores(self.pattern_histogram(guess, candidates).values(), self.objectives, masses)
+    
+    def pattern_histogram(self, guess, candidates):
+        """Feedback histogram {feedback: count} of a guess (word index) against the candidates, cached"""
         pattern_counts = defaultdict(int)
         total = len(candidates)
         
         # Use cached patterns if available
-        cache_key = (guess, tuple(candidates))
+        cache_key = (guess, candidates.tobytes())
         if cache_key in self.pattern_cache:
             pattern_counts = self.pattern_cache[cache_key]
+            self.metrics.counters['pattern_cache_hits'] += 1
         else:
-            for answer in candidates:
+            self.metrics.counters['pattern_cache_misses'] += 1
+            hits = 0
+            guess_word = self.full_list[guess]
+            for answer in candidates.tolist():
                 # Use cached feedback if available
                 cache_fb_key = (guess, answer)
                 if cache_fb_key in self.feedback_cache:
                     fb = self.feedback_cache[cache_fb_key]
+                    hits += 1
                 else:
-                    fb = get_feedback_cached(guess, answer)
+                    fb = self.get_feedback_cached(guess_word, self.full_list[answer])
                     self.feedback_cache[cache_fb_key] = fb
                 pattern_counts[fb] += 1
+            self.metrics.counters['feedback_cache_hits'] += hits
+            self.metrics.counters['feedback_cache_misses'] += total - hits
             self.pattern_cache[cache_key] = pattern_counts
-        
-        # Calculate information gain
-        gain = 0
-        for count in pattern_counts.values():
-            if count > 0:
-                p_val = count / total
-                gain += p_val * math.log2(total / count)
-        
-        return gain
+        return pattern_counts
+    
+    def encoded_guesses(self):
+        """Kana codes of every allowed guess, encoded once"""
+        if self.guess_codes is None:
+            self.guess_codes = encode_words(self.full_list)
+        return self.guess_codes
     
-    def find_best_guess(self, candidates):
-        """Find the best guess using information theory"""
+    def shortlist_size(self, candidate_count):
+        """Guesses besides the candidates that fit in the search budget, or None for all of them"""
+        if self.search_budget is None:
+            return None
+        return max(MIN_SHORTLIST, int(self.search_budget / (self.pair_seconds * candidate_count)) - candidate_count)
+    
+    def select_guesses(self, candidates, keep, codes=None):
+        """Word indices of the candidates plus the `keep` guesses with the best coverage scores, in
+        guess order. In hard mode only the candidates can be played. With NumPy, `codes` may give
+        another guess list's encoded words, which the candidates then index."""
+        if self.hard_mode:
+            return candidates
+        if codes is None and np is not None:
+            codes = self.encoded_guesses()
+        guess_count = len(self.full_list) if codes is None else len(codes)
+        if keep is None or keep + len(candidates) >= guess_count:
+            return self.all_guesses if guess_count == len(self.full_list) else np.arange(guess_count, dtype=np.int32)
+        if np is None:
+            if len(candidates) <= FULL_SEARCH_THRESHOLD:
+                return candidates
+            # Scored in pure Python, every candidate would not fit in the budget: only the most
+            # frequent candidates that do are scored
+            limit = max(MIN_SHORTLIST, int(self.search_budget / (self.pair_seconds * len(candidates))))
+            chosen = set(sorted(candidates, key=self.frequency_rank.__getitem__)[:limit])
+            return array.array('i', [idx for idx in candidates if idx in chosen])
+        scores = coverage_scores(codes, codes[candidates])
+        chosen = np.zeros(guess_count, dtype=bool)
+        chosen[np.argsort(-scores, kind='stable')[:keep]] = True
+        chosen[candidates] = True
+        return np.flatnonzero(chosen).astype(np.int32)
+    
+    def find_best_guess(self, candidates, shortlist=None):
+        """Find the best guess using information theory.
+        
+        Exact gains are computed for the candidates plus `shortlist` coverage-shortlisted
+        guesses; by default the shortlist is sized to the search budget.
+        """
         candidate_count = len(candidates)
         # For very small candidate sets, just return the first candidate
         if candidate_count == 1:
-            return candidates[0], 0
+            return self.full_list[candidates[0]], 0
         
         best_guess = None
-        best_gain = -1
+        best_scores = None
         start_time = time.time()
         
         # Determine which words to evaluate as potential guesses
-        # Always evaluate all candidates when feasible
-        if candidate_count <= 200:
-            guess_set = candidates
-        else:
-            # For large candidate sets, evaluate entire dictionary
-            guess_set = self.full_list
+        if shortlist is None:
+            shortlist = self.shortlist_size(candidate_count)
+        guess_set = self.select_guesses(candidates, shortlist)
         
+        # Guesses that split the candidates identically only need to be scored once
+        classes = guess_classes(guess_set, candidates, self.full_list)
+        self.last_guess_classes = classes
         guess_count = len(guess_set)
-        print(f"    Evaluating {p.no('potential guess', guess_count)}...")
+        class_count = len(classes)
+        self.report('search_start', total=guess_count, classes=class_count, candidates=candidate_count,
+                    dictionary=len(self.full_list))
         
-        # Evaluate all possible guesses in the guess set
-        for idx, guess in enumerate(guess_set):
-            gain = self.expected_information_gain(guess, candidates)
-            
-            if gain > best_gain:
-                best_gain = gain
-                best_guess = guess
-            
-            # Print progress every 10% of the way
-            if (idx + 1) % max(1, guess_count // 10) == 0:
-                elapsed = time.time() - start_time
-                print(f"      Processed {p.no('guess', idx+1)} of {p.no('guess', guess_count)} "
-                      f"({(idx+1)/guess_count*100:.1f}%) - Elapsed: {elapsed:.1f}s")
+        # When this round only removed a few of the previous search's candidates, subtracting
+        # them from the previous histograms is cheaper than rebuilding from the survivors
+        candidate_set = set(candidates.tolist())
+        previous = {}
+        removed = []
+        round_candidates = self.round_candidates.tolist()
+        if candidate_set.issubset(round_candidates):
+            removed = [answer for answer in round_candidates if answer not in candidate_set]
+            if len(removed) < candidate_count and not self.weighted:
+                previous = self.round_histograms
+        histograms = {}
+        decremented = 0
+        
+        # Rebuild or decrement is decided first: previous histograms are decremented by the
+        # engine that built them, otherwise the engine is chosen by the size of the search
+        if previous:
+            block = self.round_engine == 'block'
+        else:
+            block = self.threads is not None or (np is not None and class_count * candidate_count >= BLOCK_SEARCH_PAIRS)
+        if block:
+            best_guess, best_scores, histograms, decremented = self.block_search(
+                [guess for guess, _ in classes], candidates, previous, removed)
+        else:
+            # Evaluate one representative per class, in guess order
+            for idx, (guess, _) in enumerate(classes):
+                counts = previous.get(guess)
+                if counts is not None:
+                    counts = dict(counts)
+                    for answer in removed:
+                        fb = self.get_feedback_cached(self.full_list[guess], self.full_list[answer])
+                        counts[fb] -= 1
+                        if not counts[fb]:
+                            del counts[fb]
+                    scores = histogram_scores(counts.values(), self.objectives)
+                    decremented += 1
+                else:
+                    scores = self.guess_scores(guess, candidates)
+                    counts = self.pattern_cache[(guess, candidates.tobytes())]
+                histograms[guess] = counts
+                
+                if best_scores is None or scores > best_scores:
+                    best_scores = scores
+                    best_guess = guess
+                
+                # Report progress every 10% of the way
+                if (idx + 1) % max(1, class_count // 10) == 0:
+                    elapsed = time.time() - start_time
+                    self.report('search_progress', processed=idx + 1, total=class_count,
+                                percent=(idx + 1) / class_count * 100, elapsed=elapsed)
+        
+        self.round_candidates = candidates
+        self.round_histograms = histograms
+        self.round_engine = 'block' if block else 'python'
+        best_gain = best_scores[0]
+        self.last_scores = dict(zip(self.objectives, best_scores))
         
         elapsed = time.time() - start_time
-        print(f"    Evaluated {p.no('guess', guess_count)} in {elapsed:.2f} seconds")
+        self.metrics.incr('guesses_evaluated', class_count)
+        self.metrics.incr('histograms_decremented', decremented)
+        self.metrics.incr('histograms_rebuilt', class_count - decremented)
+        self.metrics.incr('guesses_deduplicated', guess_count - class_count)
+        self.metrics.observe('guess_classes', class_count)
+        self.metrics.incr('guesses_pruned', len(self.full_list) - guess_count)
+        self.metrics.observe('search_seconds', elapsed)
+        if elapsed > 0:
+            self.metrics.set_gauge('guesses_per_second', guess_count / elapsed)
+        if elapsed > 0.05:
+            # Follow the measured exact-stage speed so the next shortlist meets the budget
+            self.pair_seconds = (self.pair_seconds + elapsed / (class_count * candidate_count)) / 2
+            self.metrics.set_gauge('exact_pair_seconds', self.pair_seconds)
+        best_guess = self.full_list[best_guess]
+        self.report('search_done', total=class_count, guesses=guess_count, candidates=candidate_count,
+                    elapsed=elapsed, guess=best_guess, gain=best_gain, decremented=decremented,
+                    largest_class=max(size for _, size in classes))
         return best_guess, best_gain
     
+    def block_search(self, guesses, candidates, previous=None, removed=()):
+        """Best guess and scores of the guesses against the candidates, scored in chunks with the
+        NumPy block kernel, on the thread pool with --threads. Guesses with a histogram in previous
+        (from the last block search) get the removed answers subtracted from it, the others are
+        counted afresh. Ties go to the earliest guess however the chunks are split and the threads
+        finish. Returns (guess, scores, {guess: packed histogram}, decremented guesses)."""
+        if self.thread_pool is None and self.threads is not None:
+            self.thread_pool = concurrent.futures.ThreadPoolExecutor(self.threads)
+        previous = previous or {}
+        codes = self.encoded_guesses()
+        candidate_codes = codes[candidates]
+        removed_codes = codes[removed] if previous else None
+        weights = self.frequencies[candidates] + 1 if self.weighted else None
+        chunk = max(1, min(THREAD_CHUNK_PAIRS // len(candidates), THREAD_CHUNK_BINS // self.pattern_count))
+        kept = [position for position, guess in enumerate(guesses) if guess in previous]
+        counted = [position for position, guess in enumerate(guesses) if guess not in previous]
+        chunks = []
+        tasks = []
+        for positions, decrement in ((kept, True), (counted, False)):
+            for start in range(0, len(positions), chunk):
+                rows = [guesses[position] for position in positions[start:start + chunk]]
+                chunks.append(positions[start:start + chunk])
+                if decrement:
+                    tasks.append((codes[rows], candidate_codes, self.objectives, None,
+                                  [previous[guess] for guess in rows], removed_codes))
+                else:
+                    tasks.append((codes[rows], candidate_codes, self.objectives, weights))
+        if self.thread_pool is not None:
+            futures = [self.thread_pool.submit(block_best_guess, *task) for task in tasks]
+            results = (future.result() for future in futures)
+        else:
+            results = (block_best_guess(*task) for task in tasks)
+        best_position, best_scores = None, None
+        histograms = {}
+        for positions, (row, scores, packed) in zip(chunks, results):
+            if (best_scores is None or scores > best_scores
+                    or (scores == best_scores and positions[row] < best_position)):
+                best_position, best_scores = positions[row], scores
+            histograms.update(zip((guesses[position] for position in positions), packed))
+        return guesses[best_position], best_scores, histograms, len(kept)
+    
+    def close_thread_pool(self):
+        if self.thread_pool is not None:
+            self.thread_pool.shutdown()
+            self.thread_pool = None
+    
+    def describe_gain(self, gain):
+        """Score of a recommended guess as shown during play"""
+        if self.objective == 'entropy':
+            return f"expected gain: {gain:.4f} bits"
+        return describe_score(self.objective, gain)
+    
+    def recommend_guess(self, candidates):
+        """Best guess for a round of play: (guess, one-step gain, two-step value or None)"""
+        if self.lookahead and self.objective == 'entropy' and 2 < len(candidates) <= LOOKAHEAD_MAX_CANDIDATES:
+            return self.find_best_lookahead(candidates, self.lookahead)
+        best_guess, best_gain = self.find_best_guess(candidates)
+        return best_guess, best_gain, None
+    
+    def find_best_lookahead(self, candidates, top_k=LOOKAHEAD_TOP_K):
+        """Best guess by expected information after two guesses, returns (guess, gain, two-step value).
+        
+        The one-step gains of the shortlisted guesses come from one feedback matrix against the
+        candidates; its top_k rows are then scored two deep by lookahead_values, spread over
+        the worker processes when there are several.
+        """
+        candidate_count = len(candidates)
+        start_time = time.time()
+        guess_set = self.select_guesses(candidates, self.shortlist_size(candidate_count))
+        classes = guess_classes(guess_set, candidates, self.full_list)
+        self.last_guess_classes = classes
+        guesses = [guess for guess, _ in classes]
+        
+        matrix = self.lookahead_matrix(guesses, candidates)
+        gains = row_gains(matrix)
+        top = np.argsort(-gains, kind='stable')[:top_k].tolist()
+        self.report('lookahead_start', candidates=candidate_count, total=len(guess_set), top_k=len(top))
+        
+        if self.workers > 1 and len(top) > 1:
+            values, hits = self.parallel_lookahead(matrix, top)
+        else:
+            values, hits = lookahead_values(matrix, top)
+        
+        # First maximum in one-step order, so ties keep the better one-step guess
+        best_row, best_value = top[0], -1
+        for row, value in zip(top, values):
+            if value is not None and value > best_value:
+                best_row, best_value = row, value
+        
+        elapsed = time.time() - start_time
+        self.metrics.incr('guesses_evaluated', len(guesses))
+        self.metrics.incr('lookahead_memo_hits', hits)
+        self.metrics.incr('lookahead_pruned', sum(1 for value in values if value is None))
+        self.metrics.observe('lookahead_seconds', elapsed)
+        best_guess = self.full_list[guesses[best_row]]
+        self.report('lookahead_done', guess=best_guess, gain=float(gains[best_row]), value=best_value,
+                    greedy=self.full_list[guesses[top[0]]], elapsed=elapsed)
+        return best_guess, float(gains[best_row]), best_value
+    
+    def lookahead_matrix(self, guesses, candidates):
+        """Feedback codes of the guesses (rows) against the candidates (columns)"""
+        codes = self.encoded_guesses()
+        dtype = np.int16 if 6 ** codes.shape[1] <= 32768 else np.int32
+        guess_rows = list(guesses)
+        if self.workers > 1:
+            pool = self.lookahead_workers()
+            answer_rows = self.answer_row[candidates].tolist()
+            chunk = max(1, len(guess_rows) // (self.workers * 4))
+            tasks = [pool.apply_async(_worker_feedback_rows, (guess_rows[start:start + chunk], answer_rows))
+                     for start in range(0, len(guess_rows), chunk)]
+            return np.concatenate([task.get() for task in tasks]).astype(dtype)
+        answers = codes[candidates]
+        matrix = np.empty((len(guesses), len(candidates)), dtype=dtype)
+        for row, guess_row in enumerate(guess_rows):
+            matrix[row] = feedback_code_row(codes[guess_row], answers)
+        return matrix
+    
+    def lookahead_workers(self):
+        """Worker pool for the lookahead, started once per game on the shared word tables"""
+        if self.lookahead_pool is None:
+            self.lookahead_pool = self.open_worker_pool()
+        return self.lookahead_pool[0]
+    
+    def parallel_lookahead(self, matrix, rows):
+        """lookahead_values over worker processes sharing the matrix, results in row order"""
+        pool = self.lookahead_workers()
+        tables = SharedTables(self.shared_backend)
+        try:
+            tables.publish('lookahead', matrix)
+            # Interleaved chunks spread the strongest candidates over every worker
+            chunks = [rows[start::self.workers] for start in range(min(self.workers, len(rows)))]
+            tasks = [pool.apply_async(_worker_lookahead, (tables.describe(), chunk))
+                     for chunk in chunks]
+            values = {}
+            hits = 0
+            for chunk, task in zip(chunks, tasks):
+                chunk_values, chunk_hits = task.get()
+                values.update(zip(chunk, chunk_values))
+                hits += chunk_hits
+        finally:
+            tables.close()
+        return [values[row] for row in rows], hits
+    
+    def close_lookahead_pool(self):
+        if self.lookahead_pool is not None:
+            self.close_worker_pool(self.lookahead_pool[0])
+            self.lookahead_pool = None
+    
+    def index_array(self, indices):
+        """Word indices as an int32 array, array('i') without NumPy"""
+        if np is None:
+            return array.array('i', indices)
+        return np.fromiter(indices, dtype=np.int32)
+    
+    def word_indices(self, words):
+        """Word-list indices of words as an int32 array"""
+        return self.index_array(self.guess_index[word] for word in words)
+    
+    def candidate_words(self, candidates):
+        """The words of word indices, for display and output"""
+        return [self.full_list[idx] for idx in candidates.tolist()]
+    
     def filter_candidates(self, guess, feedback, candidates):
-        """Filter candidates based on feedback"""
-        new_candidates = []
-        for word in candidates:
-            if get_feedback_cached(guess, word) == feedback:
-                new_candidates.append(word)
-        return new_candidates
-    
-    def sort_candidates(self, candidates):
-        """Sort candidates by frequency (missing = 0) then alphabetically"""
-        # Sort by frequency descending, then alphabetically
-        return sorted(
-            candidates,
-            key=lambda word: (
-                -self.frequency_dict.get(word, 0),  # Higher frequency first
-                word  # Then alphabetical
-            )
-        )
-    
-    def display_candidates(self, candidates):
-        """Display candidates with frequency information"""
+        """The candidates (word indices) whose feedback for guess matches, in their original order"""
+        if np is None or guess not in self.guess_index:
+            return self.index_array(idx for idx in candidates.tolist()
+                                    if self.get_feedback_cached(guess, self.full_list[idx]) == feedback)
+        codes = self.encoded_guesses()
+        row = feedback_code_row(codes[self.guess_index[guess]], codes[candidates])
+        return candidates[row == feedback_code(feedback)]
+    
+    def sort_candidates(self, candidates, limit=None):
+        """Words of the candidates by frequency (missing = 0) then alphabetically, the first limit"""
+        if np is None:
+            ranked = sorted(candidates, key=self.frequency_rank.__getitem__)
+            return [self.full_list[idx] for idx in (ranked[:limit] if limit else ranked)]
+        ranks = self.frequency_rank[candidates]
+        if limit and limit < len(ranks):
+            # Select the best ranks first so only those are sorted
+            top = np.argpartition(ranks, limit - 1)[:limit]
+            order = top[np.argsort(ranks[top])]
+        else:
+            order = np.argsort(ranks)
+        return self.candidate_words(candidates[order])
+    
+    def fits_history(self, word, history):
+        """Whether playing word is allowed in hard mode after the (guess, feedback) history"""
+        return all(self.get_feedback_cached(guess, word) == feedback for guess, feedback in history)
+    
+    def display_candidates(self, candidates, limit=DISPLAY_LIMIT):
+        """Display candidates (the most frequent limit of them) with frequency information"""
         candidate_count = len(candidates)
-        sorted_candidates = self.sort_candidates(candidates)
+        sorted_candidates = self.sort_candidates(candidates, limit)
         
         if candidate_count == 1:
             print("  The only possible solution:")
+        elif len(sorted_candidates) < candidate_count:
+            print(f"  Top {len(sorted_candidates)} of {p.no('possible solution', candidate_count)} (sorted by frequency):")
         else:
             print(f"  All {p.no('possible solution', candidate_count)} (sorted by frequency):")
             
@@ -473,40 +2498,16 @@ class EntropySolver:
     
     def run(self):
         """Main solving loop"""
-        total_words = len(self.full_list)
-        print(f"Loaded {p.no('word', total_words)}")
-        
-        if self.frequency_dict:
-            known = sum(1 for word in self.full_list if word in self.frequency_dict)
-            known_percent = known/total_words*100
-            print(f"Frequency data available for {p.no('word', known)} out of "
-                  f"{p.no('word', total_words)} ({known_percent:.1f}%)")
-        print("Starting solver...")
+        first_guess, first_gain = self.prepare_openers()
         
-        # First guess handling
-        if not self.precomputed_first_guess:
-            print("No precomputed first guess found.")
-            first_guess, first_gain = self.precompute_first_guess()
-        else:
-            first_guess, first_gain = self.precomputed_first_guess
-            print(f"Using precomputed first guess: {first_guess} ({first_gain:.4f} bits)")
-        
-        # Precompute second guesses if needed
-        if not self.precomputed_second_guesses:
-            print("No precomputed second guesses found.")
-            self.precompute_second_guesses(first_guess)
-        else:
-            # Check how many patterns are missing
-            all_feedbacks = list(itertools.product([0,1,2,3,4,5], repeat=4))
-            missing = [fb for fb in all_feedbacks if fb not in self.precomputed_second_guesses]
-            if missing:
-                print(f"Found {len(missing)} missing patterns in second guess cache, resuming precomputation...")
-                self.precompute_second_guesses(first_guess)
-            else:
-                print("Second guess cache is complete for all 1296 patterns")
+        # Worker processes start up while the first guesses are played
+        if self.lookahead and self.workers > 1:
+            self.lookahead_workers()
         
         # First guess
         print(f"\n=== ROUND 1 ===")
+        if self.hard_mode:
+            print("Hard mode: every guess must fit the feedback so far")
         print(f"Recommended first guess: {first_guess}")
         user_guess = input("Enter your actual first guess (or press Enter to use recommendation): ").strip()
         
@@ -517,16 +2518,24 @@ class EntropySolver:
             user_guess = first_guess
         
         # Get feedback for first guess
-        feedback_str = input("Enter feedback for first guess (4 digits): ").strip()
+        feedback_str = input(f"Enter feedback for first guess ({self.word_length} digits): ").strip()
         feedback_tuple = self.parse_feedback(feedback_str)
         
         # Filter candidates
-        self.candidates = self.filter_candidates(user_guess, feedback_tuple, self.candidates)
+        prev_count = len(self.candidates)
+        start_time = time.time()
+        # A cached opener's partition answers round 1 without computing any feedback
+        candidates = self.opener_candidates(user_guess, feedback_tuple)
+        if candidates is None:
+            candidates = self.filter_candidates(user_guess, feedback_tuple, self.candidates)
+        self.candidates = candidates
         candidate_count = len(self.candidates)
+        history = [(user_guess, feedback_tuple)]
+        self.record_round(1, user_guess, prev_count, candidate_count, 0.0, time.time() - start_time)
         print(f"  {p.no('candidate', candidate_count)} remain{'s' if candidate_count == 1 else ''}")
         
-        # Show all candidates when <= 50 remain
-        if 0 < candidate_count <= 50:
+        # Show all candidates when few remain
+        if 0 < candidate_count <= DISPLAY_LIMIT:
             self.display_candidates(self.candidates)
         
         # Subsequent guesses
@@ -540,18 +2549,23 @@ class EntropySolver:
             if user_guess == first_guess and self.precomputed_second_guesses:
                 cached_second_guess = self.precomputed_second_guesses.get(feedback_tuple, (None, 0))
             
+            start_time = time.time()
             if cached_second_guess and cached_second_guess[0]:
                 best_guess, best_gain = cached_second_guess
-                print(f"Using precomputed second guess: {best_guess} ({best_gain:.4f} bits)")
+                recommend_seconds = time.time() - start_time
+                print(f"Using precomputed second guess: {best_guess} ({describe_score(self.objective, best_gain)})")
             else:
                 # Find best guess normally
-                start_time = time.time()
-                best_guess, best_gain = self.find_best_guess(self.candidates)
-                elapsed = time.time() - start_time
-                print(f"Recommended guess: {best_guess} (expected gain: {best_gain:.4f} bits) - computed in {elapsed:.2f} seconds")
+                best_guess, best_gain, two_step = self.recommend_guess(self.candidates)
+                elapsed = recommend_seconds = time.time() - start_time
+                if two_step is not None:
+                    print(f"Recommended guess: {best_guess} ({self.describe_gain(best_gain)}, "
+                          f"{two_step:.4f} bits over two guesses) - computed in {elapsed:.2f} seconds")
+                else:
+                    print(f"Recommended guess: {best_guess} ({self.describe_gain(best_gain)}) - computed in {elapsed:.2f} seconds")
             
             # Show candidates AFTER evaluation but BEFORE recommendation
-            if 0 < candidate_count <= 50:
+            if 0 < candidate_count <= DISPLAY_LIMIT:
                 self.display_candidates(self.candidates)
             
             user_input = input("Enter your guess (or press Enter to use recommendation): ").strip()
@@ -560,30 +2574,37 @@ class EntropySolver:
             elif user_input not in self.full_list:
                 print("Word not in list, using recommendation instead")
                 user_guess = best_guess
+            elif self.hard_mode and not self.fits_history(user_input, history):
+                print("Word does not fit the feedback so far (hard mode), using recommendation instead")
+                user_guess = best_guess
             else:
                 user_guess = user_input
             
             # Get feedback
-            feedback_str = input("Enter feedback (4 digits): ").strip()
+            feedback_str = input(f"Enter feedback ({self.word_length} digits): ").strip()
             feedback_tuple = self.parse_feedback(feedback_str)
             
             # Filter candidates
             prev_count = candidate_count
+            start_time = time.time()
             self.candidates = self.filter_candidates(user_guess, feedback_tuple, self.candidates)
             candidate_count = len(self.candidates)
+            history.append((user_guess, feedback_tuple))
             removed = prev_count - candidate_count
+            self.record_round(round_num, user_guess, prev_count, candidate_count,
+                              recommend_seconds, time.time() - start_time)
             
             print(f"  Removed {p.no('candidate', removed)}, {p.no('candidate', candidate_count)} remain{'s' if candidate_count == 1 else ''}")
             
-            # Show all candidates when <= 50 remain
-            if 0 < candidate_count <= 50:
+            # Show all candidates when few remain
+            if 0 < candidate_count <= DISPLAY_LIMIT:
                 self.display_candidates(self.candidates)
             
             round_num += 1
         
         # Final result
         if candidate_count == 1:
-            solution = self.candidates[0]
+            solution = self.full_list[self.candidates[0]]
             frequency = self.frequency_dict.get(solution, 0)
             print(f"\nSOLUTION FOUND: {solution}")
             if frequency > 0:
@@ -595,21 +2616,1126 @@ class EntropySolver:
             print("- Inconsistent feedback provided")
             print("- Word not in original list")
             if candidate_count > 0:
-                print(f"Remaining {p.no('candidate', candidate_count)}: {', '.join(self.candidates)}")
+                print(f"Remaining {p.no('candidate', candidate_count)}: {', '.join(self.candidate_words(self.candidates))}")
+        self.close_lookahead_pool()
+        self.close_thread_pool()
+        self.release_tables()
+    
+    def prepare_openers(self):
+        """Print the word list summary, bring the cache up to date and return the first guess"""
+        total_words = len(self.full_list)
+        print(f"Loaded {p.no('word', total_words)}")
+        if self.answer_list is not self.full_list:
+            print(f"Answers limited to {p.no('word', len(self.answer_list))}")
+        if self.hard_mode:
+            print("Hard mode: guesses are chosen among the remaining candidates")
+        
+        if self.frequency_dict:
+            known = sum(1 for word in self.full_list if word in self.frequency_dict)
+            known_percent = known/total_words*100
+            print(f"Frequency data available for {p.no('word', known)} out of "
+                  f"{p.no('word', total_words)} ({known_percent:.1f}%)")
+        print("Starting solver...")
+        
+        # Apply edits to wordlist.ts incrementally when partition histograms are available
+        self.sync_wordlist()
+        
+        # First guess handling
+        if not self.precomputed_first_guess:
+            print("No precomputed first guess found.")
+            first_guess, first_gain = self.precompute_first_guess()
+        else:
+            first_guess, first_gain = self.precomputed_first_guess
+            print(f"Using precomputed first guess: {first_guess} ({describe_score(self.objective, first_gain)})")
+        
+        # Caches from before opener partitions were kept get the partition added
+        partitioned = first_guess in self.opener_partitions
+        
+        # Precompute second guesses if needed
+        if not self.precomputed_second_guesses:
+            print("No precomputed second guesses found.")
+            self.precompute_second_guesses(first_guess)
+        else:
+            # Check how many reachable patterns are missing
+            missing = self.missing_second_guesses(first_guess)
+            if missing:
+                print(f"Found {len(missing)} missing patterns in second guess cache, resuming precomputation...")
+                self.precompute_second_guesses(first_guess)
+            else:
+                print("Second guess cache is complete for all reachable patterns")
+                if not partitioned:
+                    self.save_cache()
+        if self.memory_report is not None:
+            self.memory_report.print_report("precompute")
+        return first_guess, first_gain
+    
+    def simulate_game(self, answer, max_rounds=20):
+        """Play a game non-interactively against a known answer, returns the list of guesses made"""
+        first_guess, _ = self.precompute_first_guess()
+        candidates = self.answer_indices
+        guesses = []
+        guess = first_guess
+        solved = tuple([4] * len(answer))
+        for round_num in range(1, max_rounds + 1):
+            guesses.append(guess)
+            feedback = self.get_feedback_cached(guess, answer)
+            if feedback == solved:
+                break
+            prev_count = len(candidates)
+            start_time = time.time()
+            grouped = self.opener_candidates(guess, feedback) if round_num == 1 else None
+            candidates = grouped if grouped is not None else self.filter_candidates(guess, feedback, candidates)
+            self.record_round(round_num, guess, prev_count, len(candidates), 0.0, time.time() - start_time)
+            if not len(candidates):
+                break
+            cached = None
+            if round_num == 1 and self.precomputed_second_guesses:
+                cached = self.precomputed_second_guesses.get(feedback)
+            if cached and cached[0]:
+                guess = cached[0]
+            else:
+                guess = self.recommend_guess(candidates)[0]
+        return guesses
+    
+    def record_round(self, round_num, guess, before, after, recommend_seconds, filter_seconds):
+        """Record latency and candidate reduction metrics for one round"""
+        self.metrics.observe('round_latency_seconds', recommend_seconds + filter_seconds)
+        self.metrics.observe('recommend_seconds', recommend_seconds)
+        self.metrics.observe('filter_seconds', filter_seconds)
+        self.metrics.observe('candidates_removed', before - after)
+        if before:
+            self.metrics.observe('candidate_reduction_ratio', (before - after) / before)
+        self.metrics.event('round', round=round_num, guess=guess, candidates_before=before,
+                           candidates_after=after, recommend_seconds=recommend_seconds,
+                           filter_seconds=filter_seconds)
+        self.metrics.flush()
     
     def parse_feedback(self, feedback_str):
         """Parse feedback string into tuple"""
-        if len(feedback_str) != 4 or not feedback_str.isdigit():
-            print("Invalid feedback format. Using '0000'")
-            return (0, 0, 0, 0)
+        if len(feedback_str) != self.word_length or any(digit not in "012345" for digit in feedback_str):
+            print(f"Invalid feedback format. Using '{'0' * self.word_length}'")
+            return (0,) * self.word_length
         return tuple(int(d) for d in feedback_str)
 
-# Run the solver
-if __name__ == "__main__":
-    print("=== 4-Kana Japanese Word Game Solver ===")
+class MultiBoardSolver:
+    """Several simultaneous boards, each guess played on every unsolved board.
+    
+    Keeps one candidate list per board around a shared EntropySolver. A guess's feedback
+    row is computed once against the union of the boards' candidates and split per board.
+    Objectives: 'sum' adds the boards' expected information (as the answers are independent,
+    this is also the information of the joint feedback), 'min' maximises the weakest board's
+    and 'weighted' weights each board by its remaining uncertainty, log2 of its candidates.
+    """
+    OBJECTIVES = ('sum', 'min', 'weighted')
+    
+    def __init__(self, solver, boards=4, objective='sum'):
+        self.solver = solver
+        self.boards = boards
+        self.objective = objective
+        self.candidates = [solver.answer_indices for _ in range(boards)]
+        self.solved = [False] * boards
+        self.guesses = []
+        self.feedbacks = [[] for _ in range(boards)]
+    
+    def open_boards(self):
+        return [board for board in range(self.boards) if not self.solved[board]]
+    
+    def cached_guess(self, board):
+        """The board's own second guess from the cache, when the opener was played"""
+        solver = self.solver
+        if len(self.guesses) != 1 or not solver.precomputed_first_guess or not solver.precomputed_second_guesses:
+            return None
+        if self.guesses[0] != solver.precomputed_first_guess[0]:
+            return None
+        return (solver.precomputed_second_guesses.get(self.feedbacks[board][0]) or (None,))[0]
+    
+    def score(self, gains, sizes):
+        """Combine per-board gains into one comparable score"""
+        if self.objective == 'min':
+            return (min(gains), sum(gains))
+        if self.objective == 'weighted':
+            weights = [math.log2(size) for size in sizes]
+            return sum(gain * weight for gain, weight in zip(gains, weights)) / sum(weights)
+        return sum(gains)
+    
+    def union(self, boards):
+        """Word indices of every candidate of the boards, in first-seen order"""
+        return self.solver.index_array(dict.fromkeys(answer for board in boards
+                                                     for answer in self.candidates[board].tolist()))
+    
+    def board_gains(self, guesses, boards):
+        """Yield (guess, per-board gains), each guess's feedback computed once over all boards"""
+        solver = self.solver
+        union = self.union(boards)
+        if np is not None:
+            codes = solver.encoded_guesses()
+            union_codes = codes[union]
+            position = {answer: idx for idx, answer in enumerate(union.tolist())}
+            columns = [np.array([position[answer] for answer in self.candidates[board].tolist()]) for board in boards]
+            minlength = 6 ** codes.shape[1]
+            for guess in guesses:
+                row = feedback_code_row(codes[guess], union_codes)
+                yield guess, [gain_from_codes(row[column], minlength)[0] for column in columns]
+            return
+        words = solver.full_list
+        for guess in guesses:
+            row = {answer: solver.get_feedback_cached(words[guess], words[answer]) for answer in union}
+            gains = []
+            for board in boards:
+                counts = defaultdict(int)
+                for answer in self.candidates[board]:
+                    counts[row[answer]] += 1
+                gains.append(histogram_gain(sorted(counts.values()), len(self.candidates[board])))
+            yield guess, gains
+    
+    def find_best_guess(self):
+        """Best guess for the unsolved boards, returns (guess, per-board gains, reason)"""
+        solver = self.solver
+        boards = self.open_boards()
+        if not self.guesses and solver.precomputed_first_guess:
+            first_guess, gain = solver.precomputed_first_guess
+            return first_guess, [gain] * len(boards), 'opener'
+        # A board down to one candidate is solved by playing it
+        for board in boards:
+            if len(self.candidates[board]) == 1:
+                return solver.full_list[self.candidates[board][0]], [0.0] * len(boards), f"solves board {board + 1}"
+        preferred = [guess for guess in (self.cached_guess(board) for board in boards) if guess]
+        if len(boards) == 1 and preferred:
+            return preferred[0], [solver.precomputed_second_guesses[self.feedbacks[boards[0]][0]][1]], 'cached'
+        
+        # Shortlist over every board's candidates, plus each board's cached second guess
+        union = self.union(boards)
+        guess_set = solver.select_guesses(union, solver.shortlist_size(len(union)))
+        extra = {solver.guess_index[guess] for guess in preferred}.difference(guess_set.tolist())
+        if extra:
+            extra.update(guess_set.tolist())
+            guess_set = solver.index_array(sorted(extra))
+        guesses = [guess for guess, _ in guess_classes(guess_set, union, solver.full_list)]
+        
+        sizes = [len(self.candidates[board]) for board in boards]
+        best_guess, best_gains, best_score = None, None, None
+        for guess, gains in self.board_gains(guesses, boards):
+            score = self.score(gains, sizes)
+            if best_score is None or score > best_score:
+                best_guess, best_gains, best_score = guess, gains, score
+        solver.metrics.incr('guesses_evaluated', len(guesses))
+        return solver.full_list[best_guess], best_gains, self.objective
+    
+    def play(self, guess, feedbacks):
+        """Apply a guess and its feedback on each unsolved board (in board order)"""
+        self.guesses.append(guess)
+        for board, feedback in zip(self.open_boards(), feedbacks):
+            self.feedbacks[board].append(feedback)
+            if all(value == 4 for value in feedback):
+                self.solved[board] = True
+                self.candidates[board] = self.solver.word_indices([guess])
+            else:
+                grouped = self.solver.opener_candidates(guess, feedback) if len(self.guesses) == 1 else None
+                if grouped is None:
+                    grouped = self.solver.filter_candidates(guess, feedback, self.candidates[board])
+                self.candidates[board] = grouped
+    
+    def run(self):
+        """Interactive multi-board game"""
+        solver = self.solver
+        solver.prepare_openers()
+        print(f"Playing {self.boards} boards at once ({self.objective} objective)")
+        round_num = 1
+        while self.open_boards():
+            boards = self.open_boards()
+            print(f"\n=== ROUND {round_num} ===")
+            for board in boards:
+                print(f"  Board {board + 1}: {p.no('candidate', len(self.candidates[board]))}")
+            start_time = time.time()
+            guess, gains, reason = self.find_best_guess()
+            elapsed = time.time() - start_time
+            solver.metrics.observe('recommend_seconds', elapsed)
+            print(f"Recommended guess: {guess} ({sum(gains):.4f} bits over {p.no('board', len(boards))}, "
+                  f"{reason}) - computed in {elapsed:.2f} seconds")
+            user_input = input("Enter your guess (or press Enter to use recommendation): ").strip()
+            if user_input and user_input not in solver.guess_index:
+                print("Word not in list, using recommendation instead")
+            elif user_input:
+                guess = user_input
+            feedbacks = [solver.parse_feedback(input(f"Enter feedback for board {board + 1} ({solver.word_length} digits): ").strip())
+                         for board in boards]
+            self.play(guess, feedbacks)
+            for board in boards:
+                if self.solved[board]:
+                    print(f"  Board {board + 1} solved: {guess}")
+                elif not len(self.candidates[board]):
+                    print(f"  Board {board + 1}: no candidates left, check the feedback")
+                    self.solved[board] = True
+                elif len(self.candidates[board]) <= 10:
+                    print(f"  Board {board + 1}: {', '.join(solver.sort_candidates(self.candidates[board]))}")
+            round_num += 1
+        print(f"\nAll boards finished in {p.no('guess', len(self.guesses))}")
+
+class WorkQueue:
+    """Precompute work queue in a shared directory.
+    
+    Units are JSON files in pending/. A worker claims one by renaming it into claimed/
+    (atomic on a shared filesystem, so exactly one worker wins), keeps the claim alive by
+    touching it, and publishes its result as results/<unit>.pkl before dropping the claim.
+    Claims whose heartbeat stops for longer than the lease are put back in pending/.
+    """
+    def __init__(self, root, lease=300):
+        self.root = root
+        self.lease = lease
+        self.pending = os.path.join(root, 'pending')
+        self.claimed = os.path.join(root, 'claimed')
+        self.results = os.path.join(root, 'results')
+        self.job_file = os.path.join(root, 'job.json')
+
+    def create(self, job, units):
+        """Write the job description and its work units, replacing any previous job"""
+        for path in (self.pending, self.claimed, self.results):
+            os.makedirs(path, exist_ok=True)
+            for name in os.listdir(path):
+                os.remove(os.path.join(path, name))
+        self._write_atomic(self.job_file, json.dumps(job, ensure_ascii=False).encode('utf-8'))
+        for idx, unit in enumerate(units):
+            name = f"{job['stage']}-{idx:06d}.json"
+            unit = dict(unit, name=name)
+            self._write_atomic(os.path.join(self.pending, name), json.dumps(unit).encode('utf-8'))
+
+    def job(self):
+        with open(self.job_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def claim(self):
+        """Claim a pending unit, returns (unit, claim path) or None when nothing is pending"""
+        for name in sorted(os.listdir(self.pending)):
+            claim_path = os.path.join(self.claimed, f"{name}@{socket.gethostname()}@{os.getpid()}")
+            try:
+                os.rename(os.path.join(self.pending, name), claim_path)
+            except (FileNotFoundError, OSError):
+                continue  # Another worker got there first
+            with open(claim_path, 'r', encoding='utf-8') as f:
+                return json.load(f), claim_path
+        return None
+
+    def heartbeat(self, claim_path):
+        try:
+            os.utime(claim_path)
+        except OSError:
+            pass  # Claim was requeued; the result is still valid if we finish first
+
+    def complete(self, unit, claim_path, result):
+        """Publish a unit's result and release its claim"""
+        result_path = os.path.join(self.results, unit['name'].replace('.json', '.pkl'))
+        self._write_atomic(result_path, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        try:
+            os.remove(claim_path)
+        except OSError:
+            pass
+
+    def requeue_stale(self):
+        """Return claims whose heartbeat is older than the lease to pending/"""
+        now = time.time()
+        requeued = 0
+        for name in os.listdir(self.claimed):
+            path = os.path.join(self.claimed, name)
+            try:
+                if now - os.path.getmtime(path) > self.lease:
+                    os.rename(path, os.path.join(self.pending, name.split('@')[0]))
+                    requeued += 1
+            except OSError:
+                continue
+        return requeued
+
+    def status(self):
+        """Counts of pending, claimed and finished units"""
+        return (len(os.listdir(self.pending)), len(os.listdir(self.claimed)),
+                len([n for n in os.listdir(self.results) if n.endswith('.pkl')]))
+
+    def load_results(self):
+        results = []
+        for name in sorted(os.listdir(self.results)):
+            if name.endswith('.pkl'):
+                with open(os.path.join(self.results, name), 'rb') as f:
+                    results.append(pickle.load(f))
+        return results
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+def coordinate_precompute(solver, queue_dir, stage, unit_size, first_guess=None):
+    """Split the first- or second-guess precompute into work units in a shared directory"""
+    job = {'stage': stage, 'guesses': solver.full_list, 'answers': solver.answer_list,
+           'shortlist': solver.precompute_shortlist, 'objective': solver.objective_tag,
+           'hard_mode': solver.hard_mode, 'created': time.time()}
+    units = []
+    if stage == 'first':
+        # Contiguous ranges of opener candidates, each scored against every answer
+        for start in range(0, len(solver.opener_list), unit_size):
+            units.append({'start': start, 'stop': min(start + unit_size, len(solver.opener_list))})
+    else:
+        job['first_guess'] = first_guess
+        groups = defaultdict(list)
+        for answer in solver.answer_list:
+            groups[solver.get_feedback_cached(first_guess, answer)].append(answer)
+        done = {}
+        if solver.precomputed_first_guess and solver.precomputed_first_guess[0] == first_guess:
+            done = solver.precomputed_second_guesses or {}
+        # Large groups get a unit of their own, small ones are bundled up to unit_size answers
+        batch, batch_size = [], 0
+        for feedback, group in sorted(groups.items(), key=lambda item: -len(item[1])):
+            if feedback in done:
+                continue
+            if batch and batch_size + len(group) > unit_size:
+                units.append({'patterns': batch})
+                batch, batch_size = [], 0
+            batch.append(list(feedback))
+            batch_size += len(group)
+        if batch:
+            units.append({'patterns': batch})
+    WorkQueue(queue_dir).create(job, units)
+    return len(units)
+
+def process_unit(solver, job, unit):
+    """Compute one work unit with a solver built from the job's word lists"""
+    if job['stage'] == 'first':
+        histograms = {}
+        scores = {}
+        for guess in solver.opener_list[unit['start']:unit['stop']]:
+            masses = {} if solver.weighted else None
+            histograms[guess] = solver.guess_histogram(guess, solver.answer_list, masses)
+            scores[guess] = histogram_scores(histograms[guess].values(), solver.objectives,
+                                             masses and masses.values())
+        solver.metrics.incr('guesses_evaluated', len(histograms))
+        return {'stage': 'first', 'histograms': histograms, 'gains': scores}
+    first_guess = job['first_guess']
+    wanted = {tuple(feedback) for feedback in unit['patterns']}
+    groups = defaultdict(list)
+    for idx, answer in zip(solver.answer_indices.tolist(), solver.answer_list):
+        fb = solver.get_feedback_cached(first_guess, answer)
+        if fb in wanted:
+            groups[fb].append(idx)
+    second_guesses = {}
+    for feedback in unit['patterns']:
+        solver.pattern_cache.clear()
+        solver.feedback_cache.clear()
+        candidates = solver.index_array(groups[tuple(feedback)])
+        second_guesses[tuple(feedback)] = solver.find_best_guess(candidates, solver.precompute_shortlist)
+    return {'stage': 'second', 'first_guess': first_guess, 'second_guesses': second_guesses}
+
+def run_worker(queue_dir, metrics, lease=300, poll=5):
+    """Claim and process units until the queue is drained"""
+    queue = WorkQueue(queue_dir, lease)
+    job = queue.job()
+    solver = EntropySolver(cache_file=None, metrics=metrics, progress=[], words=job['guesses'],
+                           answers=job['answers'], shortlist=job.get('shortlist', PRECOMPUTE_SHORTLIST),
+                           objective=job.get('objective', 'entropy'), hard_mode=job.get('hard_mode', False))
+    processed = 0
+    while True:
+        claimed = queue.claim()
+        if claimed is None:
+            pending, in_progress, _ = queue.status()
+            if queue.requeue_stale():
+                continue
+            if in_progress == 0 and pending == 0:
+                break
+            time.sleep(poll)
+            continue
+        unit, claim_path = claimed
+        
+        # Keep the claim alive while the unit is computed
+        stop = threading.Event()
+        def beat():
+            while not stop.wait(max(1, lease / 3)):
+                queue.heartbeat(claim_path)
+        beater = threading.Thread(target=beat, daemon=True)
+        beater.start()
+        start_time = time.time()
+        try:
+            result = process_unit(solver, job, unit)
+        finally:
+            stop.set()
+            beater.join()
+        queue.complete(unit, claim_path, result)
+        processed += 1
+        metrics.observe('unit_seconds', time.time() - start_time)
+        metrics.flush()
+        print(f"  Worker {os.getpid()}: finished {unit['name']} in {time.time() - start_time:.1f} seconds")
+    print(f"Worker {os.getpid()}: queue drained after {p.no('unit', processed)}")
+
+def merge_results(solver, queue_dir):
+    """Merge finished units into the solver cache, returns False while units are outstanding"""
+    queue = WorkQueue(queue_dir)
+    job = queue.job()
+    pending, in_progress, _ = queue.status()
+    if pending or in_progress:
+        print(f"Queue not finished: {pending} pending, {in_progress} in progress")
+        return False
+    results = queue.load_results()
+    if job['stage'] == 'first':
+        histograms = {}
+        gains = {}
+        for result in results:
+            histograms.update(result['histograms'])
+            gains.update(result['gains'])
+        # Same tie-breaking as the sequential scan: the earliest guess wins
+        best_guess, best_scores = None, None
+        for guess in solver.opener_list:
+            if best_scores is None or gains[guess] > best_scores:
+                best_guess, best_scores = guess, gains[guess]
+        best_gain = best_scores[0]
+        solver.rank_openers((guess, gains[guess]) for guess in solver.opener_list)
+        if not solver.precomputed_first_guess or solver.precomputed_first_guess[0] != best_guess:
+            solver.precomputed_second_guesses = None
+        solver.precomputed_first_guess = (best_guess, best_gain)
+        solver.guess_histograms = histograms
+        solver.save_histograms()
+        print(f"Merged {p.no('guess', len(gains))}: optimal first guess {best_guess} "
+              f"({describe_score(solver.objective, best_gain)})")
+    else:
+        second_guesses = solver.precomputed_second_guesses or {}
+        if solver.precomputed_first_guess and solver.precomputed_first_guess[0] != job['first_guess']:
+            second_guesses = {}
+        for result in results:
+            second_guesses.update(result['second_guesses'])
+        solver.precomputed_second_guesses = second_guesses
+        print(f"Merged second guesses for {p.no('pattern', sum(1 for v in second_guesses.values() if v[0]))}")
+    solver.save_cache()
+    return True
+
+class BatchRecommender:
+    """Next-guess recommendations for game histories, sharing work between histories.
+    
+    Candidate lists are cached per history prefix, so histories that start the same way
+    are only filtered once past the shared part; recommendations are cached per history.
+    """
+    def __init__(self, solver, prefix_cache=BATCH_PREFIX_CACHE):
+        self.solver = solver
+        self.prefix_cache_size = prefix_cache
+        self.prefixes = {(): solver.answer_indices}
+        self.recommendations = {}
+        self.metrics = solver.metrics
+    
+    def parse_history(self, history):
+        """Validate [[guess, feedback], ...] and return it as a tuple of (guess, feedback tuple)"""
+        steps = []
+        for step in history:
+            if not isinstance(step, (list, tuple)) or len(step) != 2:
+                raise ValueError(f"history steps must be [guess, feedback] pairs, got {step!r}")
+            guess, feedback = step
+            if guess not in self.solver.guess_index:
+                raise ValueError(f"{guess} is not in the word list")
+            if self.solver.hard_mode and not self.solver.fits_history(guess, steps):
+                raise ValueError(f"{guess} does not fit the earlier feedback (hard mode)")
+            feedback = str(feedback)
+            if len(feedback) != len(guess) or any(digit not in "012345" for digit in feedback):
+                raise ValueError(f"feedback {feedback!r} for {guess} must be {len(guess)} digits from 0 to 5")
+            steps.append((guess, tuple(int(digit) for digit in feedback)))
+        return tuple(steps)
+    
+    def candidates(self, history):
+        """Candidates left after a parsed history, filtering from its longest cached prefix"""
+        length = len(history)
+        while history[:length] not in self.prefixes:
+            length -= 1
+        self.metrics.incr('batch_prefix_steps_reused', length)
+        candidates = self.prefixes[history[:length]]
+        for end in range(length + 1, len(history) + 1):
+            guess, feedback = history[end - 1]
+            grouped = self.solver.opener_candidates(guess, feedback) if end == 1 else None
+            candidates = grouped if grouped is not None else self.solver.filter_candidates(guess, feedback, candidates)
+            if len(self.prefixes) >= self.prefix_cache_size:
+                # Drop the oldest entry but keep the root
+                del self.prefixes[next(key for key in self.prefixes if key)]
+            self.prefixes[history[:end]] = candidates
+        return candidates
+    
+    def recommend(self, history):
+        """Result record (without the id) for a parsed history"""
+        if history in self.recommendations:
+            self.metrics.incr('batch_recommendation_hits')
+            return dict(self.recommendations[history])
+        solver = self.solver
+        candidates = self.candidates(history)
+        record = {'candidates': len(candidates)}
+        first_guess = solver.precomputed_first_guess
+        if not len(candidates):
+            record.update(guess=None, source='none', error="no candidates match the history")
+        elif len(candidates) == 1:
+            record.update(guess=solver.full_list[candidates[0]], gain=0.0, source='solved')
+        elif not history and first_guess:
+            record.update(guess=first_guess[0], gain=first_guess[1], source='opener')
+        elif not history:
+            record.update(guess=None, source='none',
+                          error="no precomputed first guess; run the solver once to build the cache")
+        else:
+            cached = None
+            if len(history) == 1 and first_guess and history[0][0] == first_guess[0]:
+                cached = (solver.precomputed_second_guesses or {}).get(history[0][1])
+            if cached and cached[0]:
+                record.update(guess=cached[0], gain=cached[1], source='second_guess')
+            else:
+                guess, gain, two_step = solver.recommend_guess(candidates)
+                record.update(guess=guess, gain=gain, source='search')
+                if two_step is not None:
+                    record['two_step'] = two_step
+        self.recommendations[history] = record
+        return dict(record)
+    
+    def process_line(self, number, line):
+        """JSON result line for one JSONL input line: {"id": ..., "history": [...]} or a bare history"""
+        self.metrics.incr('batch_records')
+        # Results, errors included, carry the request's id once it is known
+        label = {'line': number}
+        try:
+            item = json.loads(line)
+            if isinstance(item, dict):
+                if 'id' in item:
+                    label = {'id': item['id']}
+                item = item.get('history', [])
+            if not isinstance(item, list):
+                raise ValueError("expected a history list")
+            record = dict(label)
+            record.update(self.recommend(self.parse_history(item)))
+        except (ValueError, TypeError) as e:
+            self.metrics.incr('batch_errors')
+            record = dict(label, error=str(e))
+        return json.dumps(record, ensure_ascii=False)
+
+# Recommender of a batch worker process
+_batch_recommender = None
+
+def _batch_worker_init(options):
+    """Pool initializer: build this worker's solver, its status going to stderr"""
+    global _batch_recommender
+    _batch_recommender = BatchRecommender(EntropySolver(progress=[stderr_status], **options))
+
+def _batch_worker_line(item):
+    return _batch_recommender.process_line(*item)
+
+def run_batch(args, metrics):
+    """Stream recommendations for JSONL game histories, one result line per input line"""
+    options = dict(wordlist_file=args.wordlist, cache_file=args.cache, answers=load_cli_answers(args),
+                   answer_min_freq=args.answer_min_freq, search_budget=args.search_budget,
+                   shortlist=args.shortlist, lookahead=args.lookahead, objective=args.objective,
+                   memory_budget=args.memory_budget, hard_mode=args.hard, threads=args.threads)
+    source = sys.stdin if args.input == '-' else open(args.input, encoding='utf-8')
+    output = sys.stdout if args.output is None else open(args.output, 'w', encoding='utf-8')
+    lines = ((number, line) for number, line in enumerate(source, 1) if line.strip())
+    start_time = time.time()
+    count = 0
+    pool = None
+    try:
+        if args.workers > 1:
+            # Records are independent; imap keeps the results in input order
+            pool = multiprocessing.get_context('spawn').Pool(args.workers, initializer=_batch_worker_init,
+                                                             initargs=(options,))
+            results = pool.imap(_batch_worker_line, lines, chunksize=16)
+        else:
+            recommender = BatchRecommender(EntropySolver(metrics=metrics, progress=[stderr_status], **options))
+            results = (recommender.process_line(number, line) for number, line in lines)
+        for result in results:
+            output.write(result + "\n")
+            output.flush()
+            count += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+    elapsed = time.time() - start_time
+    metrics.observe('batch_seconds', elapsed)
+    rate = f" ({count / elapsed:.0f} records/sec)" if elapsed > 0 else ""
+    print(f"Processed {p.no('record', count)} in {elapsed:.2f} seconds{rate}", file=sys.stderr)
+
+# Functions worth a line of their own in the profile summary
+PROFILE_FUNCTIONS = ['get_feedback', 'get_feedback_cached', 'pattern_histogram', 'guess_scores',
+                     'find_best_guess', 'filter_candidates']
+
+def sample_words(words, limit, seed=0):
+    """Seeded random subset of a word list (kept in original order), or the whole list"""
+    if limit is None or limit >= len(words):
+        return list(words)
+    chosen = set(random.Random(seed).sample(range(len(words)), limit))
+    return [word for idx, word in enumerate(words) if idx in chosen]
+
+class StackSampler:
+    """Sampling profiler recording collapsed stacks of one thread for flame graphs"""
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.stacks = defaultdict(int)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_collapsed(self, path):
+        """Write stacks in the collapsed format read by flamegraph.pl and speedscope"""
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in sorted(self.stacks.items()):
+                f.write(f"{stack} {count}\n")
+
+def print_profile_summary(stats, functions=PROFILE_FUNCTIONS):
+    """Short per-function summary (calls, own time, cumulative time) for the solver's hot functions"""
+    totals = {}
+    for (filename, _, name), (_, calls, tottime, cumtime, _) in stats.stats.items():
+        if name in functions and os.path.basename(filename) == os.path.basename(__file__):
+            totals[name] = (calls, tottime, cumtime)
+    print(f"{'function':<28}{'calls':>12}{'tottime':>10}{'cumtime':>10}{'us/call':>10}")
+    for name in functions:
+        if name not in totals:
+            print(f"{name:<28}{'-':>12}")
+            continue
+        calls, tottime, cumtime = totals[name]
+        per_call = tottime / calls * 1e6 if calls else 0
+        print(f"{name:<28}{calls:>12}{tottime:>10.3f}{cumtime:>10.3f}{per_call:>10.2f}")
+
+def run_profile(args, metrics):
+    """Run one precompute stage or a simulated game on a word subset under cProfile and a stack sampler"""
+    words = sample_words(load_wordlist(args.wordlist), args.profile_words, args.seed)
+    solver = EntropySolver(cache_file=None, metrics=metrics, progress=[], words=words,
+                           memory_budget=args.memory_budget)
+    if args.memory_report:
+        solver.memory_report = MemoryReport(solver).start()
+    print(f"Profiling '{args.profile}' on {p.no('word', len(words))} (seed {args.seed})")
+    
+    # Work the profiled stage depends on is done before profiling starts
+    if args.profile == 'second':
+        first_guess, _ = solver.find_best_opener()
+        target = lambda: solver.precompute_second_guesses(first_guess)
+    elif args.profile == 'game':
+        # Only the opener: without second-guess tables every later round is a real search
+        solver.precomputed_first_guess = solver.find_best_opener()
+        answer = random.Random(args.seed).choice(words)
+        target = lambda: print(f"Simulated game for {answer}: {' → '.join(solver.simulate_game(answer))}")
+    else:
+        target = solver.find_best_opener
+    solver.get_feedback_cached.cache_clear()
+    
+    profiler = cProfile.Profile()
+    sampler = StackSampler()
+    start_time = time.time()
+    sampler.start()
+    profiler.enable()
+    try:
+        target()
+    finally:
+        profiler.disable()
+        sampler.stop()
+    elapsed = time.time() - start_time
+    
+    pstats_path = f"{args.profile_out}.pstats"
+    collapsed_path = f"{args.profile_out}.collapsed"
+    profiler.dump_stats(pstats_path)
+    sampler.write_collapsed(collapsed_path)
+    print(f"Profiled run took {elapsed:.2f} seconds")
+    print(f"Wrote {pstats_path} and {collapsed_path} ({p.no('sample', sum(sampler.stacks.values()))})")
+    print_profile_summary(pstats.Stats(profiler))
+    if solver.memory_report is not None:
+        solver.memory_report.print_report(f"the profiled {args.profile} run")
+
+def benchmark_positions(solver, count, low, high, seed=0):
+    """Candidate sets left after a random opener against a random answer, sized between low and high"""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count * 50):
+        if len(positions) == count:
+            break
+        guess, answer = rng.choice(solver.full_list), rng.choice(solver.answer_list)
+        candidates = solver.filter_candidates(guess, solver.get_feedback_cached(guess, answer), solver.answer_indices)
+        if low <= len(candidates) <= high:
+            positions.append(candidates)
+    return positions
+
+def exhaustive_gains(solver, candidates):
+    """Exact gain of every allowed guess against the candidates, vectorised"""
+    codes = solver.encoded_guesses()
+    answers = codes[candidates]
+    minlength = 6 ** codes.shape[1]
+    return [gain_from_codes(feedback_code_row(row, answers), minlength)[0] for row in codes]
+
+def run_search_benchmark(args, metrics):
+    """Compare shortlisted searches against the exhaustive search on random positions"""
+    if np is None:
+        print("The search benchmark needs NumPy")
+        return False
+    solver = EntropySolver(wordlist_file=args.wordlist, cache_file=None, metrics=metrics, progress=[],
+                           answers=load_cli_answers(args), answer_min_freq=args.answer_min_freq,
+                           search_budget=args.search_budget)
+    positions = benchmark_positions(solver, args.positions, args.min_candidates, args.max_candidates, args.seed)
+    print(f"Search accuracy over {p.no('position', len(positions))} "
+          f"({args.min_candidates}-{args.max_candidates} candidates, seed {args.seed})")
+    modes = [('auto', None)] + [(str(keep), keep) for keep in args.shortlists]
+    results = {mode: [] for mode, _ in [('exhaustive', None)] + modes}
+    for candidates in positions:
+        start_time = time.time()
+        best = max(exhaustive_gains(solver, candidates))
+        results['exhaustive'].append((len(solver.full_list), best, best, time.time() - start_time))
+        for mode, keep in modes:
+            # Every mode starts cold: no cached feedback, patterns or previous-round histograms
+            solver.pattern_cache.clear()
+            solver.feedback_cache.clear()
+            solver.get_feedback_cached.cache_clear()
+            solver.round_candidates = solver.index_array(())
+            solver.round_histograms = {}
+            start_time = time.time()
+            _, gain = solver.find_best_guess(candidates, keep)
+            elapsed = time.time() - start_time
+            guesses = sum(size for _, size in solver.last_guess_classes)
+            results[mode].append((guesses, gain, best, elapsed))
+    
+    print(f"{'mode':<12}{'guesses':>9}{'optimal':>10}{'mean ratio':>12}{'worst ratio':>13}{'mean time':>11}")
+    for mode, rows in results.items():
+        if not rows:
+            continue
+        ratios = [gain / best if best > 0 else 1.0 for _, gain, best, _ in rows]
+        optimal = sum(1 for _, gain, best, _ in rows if gain >= best - 1e-9)
+        mean_guesses = sum(row[0] for row in rows) / len(rows)
+        mean_time = sum(row[3] for row in rows) / len(rows)
+        print(f"{mode:<12}{mean_guesses:>9.0f}{f'{optimal}/{len(rows)}':>10}{sum(ratios) / len(ratios):>12.4f}"
+              f"{min(ratios):>13.4f}{mean_time:>10.2f}s")
+        metrics.event('search_benchmark', mode=mode, positions=len(rows), optimal=optimal,
+                      mean_ratio=sum(ratios) / len(ratios), worst_ratio=min(ratios), mean_seconds=mean_time)
+    return True
+
+def peak_rss_mb():
+    """Peak resident set size of this process and its finished children in MB, or None"""
+    if resource is None:
+        return None
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return max(own, children) / scale
+
+def scaling_exponent(sizes, values):
+    """Least-squares slope of log(value) against log(size): cost grows as size ** exponent"""
+    points = [(math.log(size), math.log(value)) for size, value in zip(sizes, values)
+              if value is not None and value > 0]
+    if len(points) < 2:
+        return None
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    if spread == 0:
+        return None
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+
+def _scaling_run(options):
+    """Benchmark one word list size; runs in a fresh process so peak RSS is this size's own"""
+    words = load_wordlist(options['wordlist'])
+    rng = random.Random(options['seed'])
+    if options['size'] and options['size'] < len(words):
+        words = [words[idx] for idx in sorted(rng.sample(range(len(words)), options['size']))]
+    solver = EntropySolver(cache_file=None, progress=[], words=words, workers=options['workers'],
+                           shortlist=options['shortlist'])
+    result = {'size': len(solver.full_list), 'answers': len(solver.answer_list)}
+    
+    # First-guess scan: every guess against every answer
+    start_time = time.time()
+    first_guess, _ = solver.find_best_opener()
+    result['opener_seconds'] = time.time() - start_time
+    result['opener_pairs_per_second'] = (len(solver.full_list) * len(solver.answer_list)
+                                         / max(result['opener_seconds'], 1e-9))
+    
+    # A sample of the second-guess patterns, solved as precompute_second_guesses does
+    partition = solver.first_guess_partition(first_guess)
+    groups = [group for group in partition.values() if len(group) > 1]
+    sample = rng.sample(groups, min(options['patterns'], len(groups)))
+    result['reachable_patterns'] = len(partition)
+    pairs = 0
+    start_time = time.time()
+    for group in sample:
+        solver.pattern_cache.clear()
+        solver.feedback_cache.clear()
+        solver.find_best_guess(group, solver.precompute_shortlist)
+        pairs += sum(size for _, size in solver.last_guess_classes) * len(group)
+    elapsed = time.time() - start_time
+    result['pattern_seconds'] = elapsed / len(sample) if sample else None
+    result['second_stage_estimate'] = elapsed / len(sample) * len(groups) if sample else None
+    result['pattern_pairs_per_second'] = pairs / elapsed if elapsed > 0 else None
+    
+    # Later rounds: candidate sets left after a random guess
+    positions = benchmark_positions(solver, options['rounds'], 10, 1000, options['seed'])
+    pairs = 0
+    start_time = time.time()
+    for candidates in positions:
+        solver.pattern_cache.clear()
+        solver.find_best_guess(candidates, solver.precompute_shortlist)
+        pairs += sum(size for _, size in solver.last_guess_classes) * len(candidates)
+    elapsed = time.time() - start_time
+    result['round_seconds'] = elapsed / len(positions) if positions else None
+    result['round_pairs_per_second'] = pairs / elapsed if elapsed > 0 else None
+    result['peak_rss_mb'] = peak_rss_mb()
+    return result
+
+def run_scaling_benchmark(args, metrics):
+    """Time precompute and search on seeded subsets of the word list and fit scaling exponents"""
+    options = dict(wordlist=args.wordlist, seed=args.seed, workers=args.workers, shortlist=args.shortlist,
+                   patterns=args.patterns, rounds=args.rounds)
+    context = multiprocessing.get_context('spawn')
+    results = []
+    print(f"{'words':>7}{'opener':>10}{'pairs/s':>11}{'pattern':>10}{'2nd stage':>11}{'round':>9}"
+          f"{'pairs/s':>11}{'peak RSS':>10}")
+    
+    def cell(value, fmt, width):
+        return f"{'-':>{width}}" if value is None else f"{value:>{width}{fmt}}"
+    for size in sorted(args.sizes, key=lambda size: size or float('inf')):
+        with context.Pool(1, maxtasksperchild=1) as pool:
+            result = pool.apply(_scaling_run, (dict(options, size=size),))
+        results.append(result)
+        metrics.event('scaling_benchmark', **result)
+        metrics.flush()
+        print(f"{result['size']:>7}{cell(result['opener_seconds'], '.2f', 9)}s"
+              f"{cell(result['opener_pairs_per_second'], '.3g', 11)}{cell(result['pattern_seconds'], '.3f', 9)}s"
+              f"{cell(result['second_stage_estimate'], '.0f', 10)}s{cell(result['round_seconds'], '.3f', 8)}s"
+              f"{cell(result['round_pairs_per_second'], '.3g', 11)}{cell(result['peak_rss_mb'], '.0f', 8)}MB",
+              flush=True)
+    
+    sizes = [result['size'] for result in results]
+    exponents = {key: scaling_exponent(sizes, [result[key] for result in results])
+                 for key in ('opener_seconds', 'pattern_seconds', 'second_stage_estimate',
+                             'round_seconds', 'peak_rss_mb')}
+    print("Scaling exponents (cost ~ words^k): " +
+          ", ".join(f"{key} {'-' if value is None else f'{value:.2f}'}" for key, value in exponents.items()))
+    with open(args.json, 'w', encoding='utf-8') as f:
+        json.dump({'seed': args.seed, 'workers': args.workers, 'shortlist': args.shortlist,
+                   'runs': results, 'exponents': exponents}, f, indent=2)
+    print(f"Wrote {args.json}")
+    return True
+
+def file_digest(path):
+    """SHA-256 of a file's contents, or None if it does not exist"""
+    if not path or not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def data_digest(data):
+    """SHA-256 of a picklable artifact"""
+    return hashlib.sha256(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)).hexdigest()
+
+def build_plan(options):
+    """Build stages as {name: (dependencies, parameters)}, each after its dependencies.
+    
+    bundle: word lists, kana codes and frequencies; matrix (with --feedback-matrix): the
+    guesses x answers feedback codes; openers: the first-guess scan (ranking and histograms);
+    second: the second-guess tables; hard_* (with --include hard): the same in hard mode;
+    pairs (with --include pairs): the best fixed opener pairs; cache: all of it installed in
+    the solver cache.
+    """
+    plan = {'bundle': ((), {'wordlist': file_digest(options['wordlist']), 'freq': file_digest("freq.csv"),
+                            'answers': options['answers'], 'answer_min_freq': options['answer_min_freq'],
+                            'kana': words_digest(KANA_ALPHABET)})}
+    scan = ('bundle', 'matrix') if options['feedback_matrix'] else ('bundle',)
+    if options['feedback_matrix']:
+        plan['matrix'] = (('bundle',), {})
+    plan['openers'] = (scan, {'objective': options['objective']})
+    plan['second'] = (('bundle', 'openers'), {'objective': options['objective'], 'shortlist': options['shortlist']})
+    installed = ['openers', 'second']
+    if 'hard' in options['include']:
+        plan['hard_openers'] = (scan, {'objective': options['objective'], 'hard_mode': True})
+        plan['hard_second'] = (('bundle', 'hard_openers'),
+                               {'objective': options['objective'], 'shortlist': options['shortlist'], 'hard_mode': True})
+        installed += ['hard_openers', 'hard_second']
+    if 'pairs' in options['include']:
+        plan['pairs'] = (('bundle', 'openers'), {'top_k': options['top_k'], 'count': options['count']})
+        installed.append('pairs')
+    plan['cache'] = (('bundle',) + tuple(installed), {'cache': options['cache']})
+    return plan
+
+def _load_artifact(build_dir, name):
+    with open(os.path.join(build_dir, name + ".pkl"), 'rb') as f:
+        return pickle.load(f)['data']
+
+def _stage_solver(options, bundle, parameters, **kwargs):
+    """Solver over a bundle's word lists for one build stage"""
+    progress = [] if options['quiet'] else None
+    solver = EntropySolver(cache_file=None, progress=progress, words=bundle['guesses'], answers=bundle['answers'],
+                           objective=parameters.get('objective', 'entropy'), workers=options['workers'],
+                           shortlist=parameters.get('shortlist', PRECOMPUTE_SHORTLIST),
+                           hard_mode=parameters.get('hard_mode', False), **kwargs)
+    if bundle['codes'] is not None:
+        # The stored codes refer to the bundle's kana alphabet, registered here in the same order
+        register_kana(bundle['alphabet'])
+        solver.guess_codes = bundle['codes']
+    return solver
+
+def _build_stage(task):
+    """Make one build artifact, returns (name, content hash, seconds)"""
+    name, parameters, inputs, options = task
+    build_dir = options['build_dir']
+    start_time = time.time()
+    if name == 'bundle':
+        solver = EntropySolver(wordlist_file=options['wordlist'], cache_file=None, progress=[],
+                               answers=options['answers'], answer_min_freq=options['answer_min_freq'])
+        codes = solver.encoded_guesses() if np is not None else None
+        data = {'guesses': solver.full_list, 'answers': solver.answer_list, 'frequencies': solver.frequencies,
+                'codes': codes, 'alphabet': list(KANA_ALPHABET)}
+    elif name == 'matrix':
+        solver = _stage_solver(options, _load_artifact(build_dir, 'bundle'), parameters)
+        guess_codes = solver.encoded_guesses()
+        answer_codes = guess_codes[solver.answer_indices]
+        dtype = np.uint16 if solver.pattern_count <= 65536 else np.int32
+        path = os.path.join(build_dir, "matrix.npy")
+        matrix = np.lib.format.open_memmap(path + ".tmp.npy", mode='w+', dtype=dtype,
+                                           shape=(len(guess_codes), len(answer_codes)))
+        solver.build_feedback_matrix(guess_codes, answer_codes, matrix)
+        del matrix
+        os.replace(path + ".tmp.npy", path)
+        data = {'path': path, 'shape': (len(guess_codes), len(answer_codes))}
+    elif name in ('openers', 'hard_openers'):
+        matrix = os.path.join(build_dir, "matrix.npy") if 'matrix' in inputs else None
+        solver = _stage_solver(options, _load_artifact(build_dir, 'bundle'), parameters, matrix_file=matrix)
+        # An interrupted scan resumes from its journal in the build directory
+        solver.checkpoint_file = os.path.join(build_dir, name + ".ckpt")
+        first_guess = solver.find_best_opener()
+        data = {'first_guess': first_guess, 'opener_table': solver.opener_table,
+                'histograms': solver.guess_histograms}
+    elif name in ('second', 'hard_second'):
+        solver = _stage_solver(options, _load_artifact(build_dir, 'bundle'), parameters)
+        first_guess = _load_artifact(build_dir, name.replace('second', 'openers'))['first_guess']
+        solver.precomputed_first_guess = first_guess
+        solver.precompute_second_guesses(first_guess[0])
+        data = {'second_guesses': solver.precomputed_second_guesses,
+                'opener_partition': solver.opener_partitions[first_guess[0]]}
+    elif name == 'pairs':
+        solver = _stage_solver(options, _load_artifact(build_dir, 'bundle'), parameters)
+        solver.guess_histograms = _load_artifact(build_dir, 'openers')['histograms']
+        data = {'top_k': parameters['top_k'], 'count': parameters['count'],
+                'pairs': solver.find_opener_pairs(parameters['top_k'], parameters['count'])}
+    elif name == 'cache':
+        bundle = _load_artifact(build_dir, 'bundle')
+        modes = [('', False), ('hard_', True)] if 'hard_openers' in inputs else [('', False)]
+        for prefix, hard_mode in modes:
+            solver = EntropySolver(cache_file=parameters['cache'], progress=[], words=bundle['guesses'],
+                                   answers=bundle['answers'], objective=options['objective'], hard_mode=hard_mode)
+            openers = _load_artifact(build_dir, prefix + 'openers')
+            second = _load_artifact(build_dir, prefix + 'second')
+            solver.precomputed_first_guess = openers['first_guess']
+            solver.opener_table = openers['opener_table']
+            solver.guess_histograms = openers['histograms']
+            solver.precomputed_second_guesses = second['second_guesses']
+            solver.opener_partitions = {openers['first_guess'][0]: second['opener_partition']}
+            if 'pairs' in inputs and not hard_mode:
+                solver.opener_pairs = _load_artifact(build_dir, 'pairs')
+            solver.save_histograms()
+            solver.save_cache()
+        data = {'cache': parameters['cache'], 'digest': file_digest(parameters['cache'])}
+    else:
+        raise ValueError(f"unknown build stage {name!r}")
+    if name != 'matrix':
+        path = os.path.join(build_dir, name + ".pkl")
+        with open(path + ".tmp", 'wb') as f:
+            pickle.dump({'stage': name, 'inputs': inputs, 'data': data}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+    return name, data_digest(data), time.time() - start_time
+
+def _stage_done(build_dir, name, record, inputs, parameters):
+    """Whether a stage's recorded artifact was made from these inputs and is still in place"""
+    if not record or record['inputs'] != inputs:
+        return False
+    if name == 'matrix':
+        return os.path.exists(os.path.join(build_dir, "matrix.npy"))
+    if not os.path.exists(os.path.join(build_dir, name + ".pkl")):
+        return False
+    # The installed cache must also still be the one the build wrote
+    return name != 'cache' or record.get('cache_digest') == file_digest(parameters['cache'])
+
+def run_build(args, metrics):
+    """Bring every artifact up to date, rebuilding a stage only when the content hashes of its
+    inputs changed; stages whose dependencies are done run together on --jobs processes"""
+    build_dir = args.build_dir
+    os.makedirs(build_dir, exist_ok=True)
+    options = dict(wordlist=args.wordlist, cache=args.cache, answers=load_cli_answers(args),
+                   answer_min_freq=args.answer_min_freq, objective=args.objective, shortlist=args.shortlist,
+                   workers=args.workers, feedback_matrix=args.feedback_matrix, include=args.include,
+                   top_k=PAIR_TOP_K, count=PAIR_RESULTS, build_dir=build_dir, quiet=args.jobs > 1)
+    plan = build_plan(options)
+    manifest_path = os.path.join(build_dir, "manifest.json")
+    manifest = {}
+    if os.path.exists(manifest_path) and not args.force:
+        with open(manifest_path, encoding='utf-8') as f:
+            manifest = json.load(f)
+    print(f"Building {p.no('stage', len(plan))} in {build_dir}")
+    start_time = time.time()
+    built = 0
+    # Not a multiprocessing.Pool: its daemonic processes could not start the stages' own --workers pools
+    pool = None
+    if args.jobs > 1:
+        pool = concurrent.futures.ProcessPoolExecutor(args.jobs, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        remaining = dict(plan)
+        while remaining:
+            # Every stage whose dependencies are finished; its inputs are their content hashes
+            ready = {}
+            for name, (dependencies, parameters) in remaining.items():
+                if all(dependency not in remaining for dependency in dependencies):
+                    inputs = {dependency: manifest[dependency]['output'] for dependency in dependencies}
+                    inputs['parameters'] = data_digest(sorted(parameters.items()))
+                    ready[name] = inputs
+            tasks = []
+            for name, inputs in ready.items():
+                del remaining[name]
+                if _stage_done(build_dir, name, manifest.get(name), inputs, plan[name][1]):
+                    print(f"  {name}: up to date")
+                    metrics.incr('build_stages_skipped')
+                else:
+                    print(f"  {name}: building...", flush=True)
+                    tasks.append((name, plan[name][1], inputs, options))
+            results = pool.map(_build_stage, tasks) if pool is not None else map(_build_stage, tasks)
+            for (name, parameters, inputs, _), (_, output, seconds) in zip(tasks, results):
+                record = {'inputs': inputs, 'output': output, 'seconds': seconds, 'built': time.time()}
+                if name == 'cache':
+                    record['cache_digest'] = file_digest(parameters['cache'])
+                manifest[name] = record
+                built += 1
+                metrics.incr('build_stages_built')
+                metrics.observe('build_stage_seconds', seconds)
+                print(f"  {name}: built in {seconds:.1f} seconds")
+                # Recorded as each stage finishes, so an interrupted build keeps what it made
+                with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f, indent=2, sort_keys=True)
+                os.replace(manifest_path + ".tmp", manifest_path)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    metrics.flush()
+    print(f"Build finished in {time.time() - start_time:.1f} seconds: {built} built, "
+          f"{len(plan) - built} up to date")
+    return True
+
+def print_banner(length):
+    """Print the feedback legend shown before an interactive game on words of length kana"""
+    print(f"=== {length}-Kana Japanese Word Game Solver ===")
     print("Information Theory Optimized Version")
     print("-------------------------------------")
-    print("Feedback Encoding:")
+    print(f"Feedback Encoding (one digit per kana, {length} in all):")
     print("0. Grey square    : Kana not in target")
     print("1. Vertical arrows: Same row (行) as target kana")
     print("2. Horizontal arrows: Same column (段) as target kana")
@@ -620,6 +3746,180 @@ if __name__ == "__main__":
     print("Note: Variants include dakuten (か→が), handakuten (は→ぱ),")
     print("      and small kana (つ→っ)")
     print("-------------------------------------")
+
+def parse_objectives(text):
+    """argparse type for --objective: comma-separated objective names"""
+    names = [name.strip() for name in text.split(',') if name.strip()]
+    unknown = [name for name in names if name not in OBJECTIVES]
+    if not names or unknown:
+        raise argparse.ArgumentTypeError(f"choose from {', '.join(OBJECTIVES)} (got {text!r})")
+    return ','.join(names)
+
+def build_arg_parser():
+    """Command line options for the solver"""
+    parser = argparse.ArgumentParser(description="Information theory solver for Kotobade Asobou")
+    parser.add_argument('--metrics-jsonl', metavar='PATH',
+                        help="append metrics events and snapshots to PATH as JSON lines")
+    parser.add_argument('--metrics-prom', metavar='PATH',
+                        help="write a Prometheus textfile with the latest metrics to PATH")
+    parser.add_argument('--wordlist', default="wordlist.ts", help="word list file (default: wordlist.ts)")
+    parser.add_argument('--cache', default="solver_cache.pkl", help="precomputed guess cache (default: solver_cache.pkl)")
+    parser.add_argument('--answers', metavar='TS_FILE',
+                        help="limit possible answers to a .ts word list (its answer array, or its only array)")
+    parser.add_argument('--answer-array', metavar='NAME',
+                        help="name of the export array holding the answers (default: the one that is not VALID_GUESSES)")
+    parser.add_argument('--answer-min-freq', type=float, metavar='FREQ',
+                        help="limit possible answers to words with at least FREQ in freq.csv")
+    parser.add_argument('--profile', choices=['first', 'second', 'game'],
+                        help="profile first-guess precompute, second-guess precompute or a simulated game")
+    parser.add_argument('--profile-words', type=int, default=400, metavar='N',
+                        help="number of words sampled from the word list when profiling (default: 400)")
+    parser.add_argument('--profile-out', default="profile", metavar='PREFIX',
+                        help="output prefix for the .pstats and .collapsed files (default: profile)")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for sampled word lists")
+    parser.add_argument('--workers', type=int, default=1, metavar='N',
+                        help="worker processes for precompute, sharing one copy of the tables (needs NumPy)")
+    parser.add_argument('--shared-backend', choices=['shm', 'mmap'], default='shm',
+                        help="share tables with workers via shared memory or memory-mapped files (default: shm)")
+    parser.add_argument('--feedback-matrix', action='store_true',
+                        help="precompute the full guesses x answers feedback matrix and share it with workers")
+    parser.add_argument('--memory-budget', type=float, metavar='MB',
+                        help="pick the precompute engine (in-RAM or memory-mapped feedback matrix, vectorised "
+                             "rows, pure Python) and size the caches to fit in about MB megabytes")
+    parser.add_argument('--memory-report', action='store_true',
+                        help="print peak memory by component after precompute or a profiled run")
+    parser.add_argument('--search-budget', type=float, default=SEARCH_BUDGET, metavar='SECONDS',
+                        help=f"target time for an interactive guess search; the coverage shortlist is sized "
+                             f"to fit it, 0 searches the whole dictionary (default: {SEARCH_BUDGET})")
+    parser.add_argument('--lookahead', type=int, nargs='?', const=LOOKAHEAD_TOP_K, default=0, metavar='K',
+                        help=f"during play, re-rank the best K guesses by expected information after two "
+                             f"guesses (default K: {LOOKAHEAD_TOP_K}; needs NumPy)")
+    parser.add_argument('--threads', type=int, nargs='?', const=0, metavar='N',
+                        help="score interactive guess searches on N threads with NumPy kernels "
+                             "(no N: one per core; default: sequential)")
+    parser.add_argument('--objective', type=parse_objectives, default='entropy', metavar='NAME[,NAME...]',
+                        help=f"what a guess is scored on: {', '.join(OBJECTIVES)}; later names break ties "
+                             f"(default: entropy)")
+    parser.add_argument('--checkpoint-interval', type=float, default=CHECKPOINT_INTERVAL, metavar='SECONDS',
+                        help=f"journal first-guess scan progress this often so an interrupted precompute resumes, "
+                             f"0 to disable (default: {CHECKPOINT_INTERVAL})")
+    parser.add_argument('--hard', action='store_true',
+                        help="hard mode: every guess must fit the feedback so far; recommendations come from "
+                             "the remaining candidates, with their own cached opener and second guesses")
+    parser.add_argument('--boards', type=int, default=1, metavar='N',
+                        help="play N boards at once, every guess counting on each board (default: 1)")
+    parser.add_argument('--board-objective', choices=MultiBoardSolver.OBJECTIVES, default='sum',
+                        help="how per-board information is combined with several boards (default: sum)")
+    parser.add_argument('--shortlist', type=int, default=PRECOMPUTE_SHORTLIST, metavar='N',
+                        help=f"coverage-shortlisted guesses scored per second-guess pattern during precompute, "
+                             f"0 for the whole dictionary (default: {PRECOMPUTE_SHORTLIST})")
+    
+    commands = parser.add_subparsers(dest='command', metavar='COMMAND',
+                                     help="play interactively (default), run a batch of histories, a distributed precompute or a benchmark")
+    coordinate = commands.add_parser('coordinate', help="write precompute work units into a shared directory")
+    coordinate.add_argument('--queue', required=True, metavar='DIR', help="shared queue directory")
+    coordinate.add_argument('--stage', choices=['first', 'second'], default='first',
+                            help="first-guess scan or second-guess tables (default: first)")
+    coordinate.add_argument('--unit-size', type=int, default=500, metavar='N',
+                            help="guesses (first stage) or answers (second stage) per unit (default: 500)")
+    coordinate.add_argument('--first-guess', help="opener for the second stage (default: the cached one)")
+    worker = commands.add_parser('worker', help="claim and process work units until the queue is drained")
+    worker.add_argument('--queue', required=True, metavar='DIR', help="shared queue directory")
+    worker.add_argument('--lease', type=float, default=300, metavar='SECONDS',
+                        help="requeue claims without a heartbeat for this long (default: 300)")
+    merge = commands.add_parser('merge', help="merge finished work units into the cache")
+    merge.add_argument('--queue', required=True, metavar='DIR', help="shared queue directory")
+    batch = commands.add_parser('batch', help="read JSONL game histories and write a next-guess recommendation for each")
+    batch.add_argument('input', nargs='?', default='-',
+                       help='JSONL file of histories, [["かいたく", "0120"], ...] or {"id": ..., "history": [...]} '
+                            'per line (default: stdin)')
+    batch.add_argument('--output', metavar='PATH', help="write results to PATH instead of stdout")
+    benchmark = commands.add_parser('benchmark', help="compare shortlisted guess searches with the exhaustive search")
+    benchmark.add_argument('--positions', type=int, default=10, metavar='N',
+                           help="random positions to search (default: 10)")
+    benchmark.add_argument('--min-candidates', type=int, default=20, metavar='N',
+                           help="smallest candidate set (default: 20)")
+    benchmark.add_argument('--max-candidates', type=int, default=1000, metavar='N',
+                           help="largest candidate set (default: 1000)")
+    benchmark.add_argument('--shortlists', type=int, nargs='*', default=[MIN_SHORTLIST, PRECOMPUTE_SHORTLIST],
+                           metavar='N', help="fixed shortlist sizes to compare besides the budgeted one")
+    scaling = commands.add_parser('scaling', help="time precompute and search on growing subsets of the word list")
+    scaling.add_argument('--sizes', type=int, nargs='+', default=[1000, 2000, 5000, 10000], metavar='N',
+                         help="word list sizes to sample, 0 for the whole list (default: 1000 2000 5000 10000)")
+    scaling.add_argument('--patterns', type=int, default=20, metavar='N',
+                         help="second-guess patterns solved per size (default: 20)")
+    scaling.add_argument('--rounds', type=int, default=5, metavar='N',
+                         help="later-round searches per size (default: 5)")
+    scaling.add_argument('--json', default="scaling.json", metavar='PATH',
+                         help="where to write the results and exponents (default: scaling.json)")
+    build = commands.add_parser('build', help="build every precomputed artifact, rebuilding only what changed")
+    build.add_argument('--build-dir', default="build", metavar='DIR',
+                       help="where artifacts and their manifest are kept (default: build)")
+    build.add_argument('--jobs', type=int, default=1, metavar='N',
+                       help="stages run at once when their dependencies are done (default: 1)")
+    build.add_argument('--include', nargs='*', choices=['hard', 'pairs'], default=[],
+                       help="also build the hard-mode tables and/or the best fixed opener pairs")
+    build.add_argument('--force', action='store_true', help="rebuild every stage")
+    openers = commands.add_parser('openers', help="list the best first guesses from the cached ranking")
+    openers.add_argument('--top', type=int, default=20, metavar='N', help="openers to list (default: 20)")
+    pairs = commands.add_parser('pairs', help="search the best fixed two-word openers by joint information")
+    pairs.add_argument('--top-k', type=int, default=PAIR_TOP_K, metavar='K',
+                       help=f"single openers tried as the first word (default: {PAIR_TOP_K})")
+    pairs.add_argument('--count', type=int, default=PAIR_RESULTS, metavar='N',
+                       help=f"pairs to report (default: {PAIR_RESULTS})")
+    return parser
+
+def show_openers(solver, top):
+    """Print the cached opener ranking"""
+    if not solver.opener_table:
+        print("No ranked openers cached; run the precompute first")
+        return False
+    for rank, (guess, gain) in enumerate(solver.opener_table[:top], 1):
+        print(f"{rank:4d}. {guess} ({describe_score(solver.objective, gain)})")
+    return True
+
+def show_opener_pairs(solver, top_k, count):
+    """Search and print the best fixed two-word openers"""
+    if np is None:
+        print("The opener pair search needs NumPy")
+        return False
+    gains = solver.single_gains()
+    cached = solver.opener_pairs
+    if cached and cached['top_k'] == top_k and cached['count'] == count:
+        pairs = cached['pairs']
+    else:
+        pairs = solver.find_opener_pairs(top_k, count)
+    print(f"\nBest fixed opener pairs (joint information over {p.no('answer', len(solver.answer_list))}):")
+    for rank, (first, second, bits) in enumerate(pairs, 1):
+        print(f"{rank:4d}. {first} + {second}: {bits:.4f} bits "
+              f"({gains[first]:.4f} + {gains[second]:.4f} bits alone)")
+    return True
+
+def load_cli_answers(args):
+    """Answer list selected with --answers/--answer-array, or None"""
+    if args.answers:
+        return load_answer_list(args.answers, args.answer_array or '*')
+    if args.answer_array:
+        return load_answer_list(args.wordlist, args.answer_array)
+    return None
+
+def create_metrics(args):
+    """Build the metrics object for the sinks requested on the command line"""
+    sinks = []
+    if args.metrics_jsonl:
+        sinks.append(JsonLinesSink(args.metrics_jsonl))
+    if args.metrics_prom:
+        sinks.append(PrometheusTextfileSink(args.metrics_prom))
+    return Metrics(sinks)
+
+# Run the solver
+if __name__ == "__main__":
+    parser = build_arg_parser()
+    args = parser.parse_args()
+    if args.hard and args.boards > 1:
+        parser.error("--hard plays a single board")
+    if args.hard and args.command == 'pairs':
+        parser.error("a fixed second word does not follow the hard-mode rule")
     
     # Check for required libraries
     try:
@@ -629,5 +3929,66 @@ if __name__ == "__main__":
         print("Please install it with: pip install inflect")
         sys.exit(1)
     
-    solver = EntropySolver()
-    solver.run()
\ No newline at end of file
+    metrics = create_metrics(args)
+    try:
+        if args.profile:
+            run_profile(args, metrics)
+        elif args.command == 'batch':
+            run_batch(args, metrics)
+        elif args.command == 'benchmark':
+            if not run_search_benchmark(args, metrics):
+                sys.exit(1)
+        elif args.command == 'scaling':
+            run_scaling_benchmark(args, metrics)
+        elif args.command == 'build':
+            run_build(args, metrics)
+        elif args.command == 'worker':
+            run_worker(args.queue, metrics, lease=args.lease)
+        elif args.command == 'merge':
+            job = WorkQueue(args.queue).job()
+            solver = EntropySolver(cache_file=args.cache, metrics=metrics, words=job['guesses'],
+                                   answers=job['answers'], objective=job.get('objective', 'entropy'),
+                                   hard_mode=job.get('hard_mode', False))
+            if not merge_results(solver, args.queue):
+                sys.exit(1)
+        elif args.command == 'openers':
+            solver = EntropySolver(wordlist_file=args.wordlist, cache_file=args.cache, metrics=metrics,
+                                   answers=load_cli_answers(args), answer_min_freq=args.answer_min_freq,
+                                   objective=args.objective, hard_mode=args.hard)
+            if not show_openers(solver, args.top):
+                sys.exit(1)
+        elif args.command == 'pairs':
+            solver = EntropySolver(wordlist_file=args.wordlist, cache_file=args.cache, metrics=metrics,
+                                   answers=load_cli_answers(args), answer_min_freq=args.answer_min_freq,
+                                   workers=args.workers, shared_backend=args.shared_backend,
+                                   feedback_matrix=args.feedback_matrix, memory_budget=args.memory_budget)
+            if not show_opener_pairs(solver, args.top_k, args.count):
+                sys.exit(1)
+        elif args.command == 'coordinate':
+            solver = EntropySolver(wordlist_file=args.wordlist, cache_file=args.cache, metrics=metrics,
+                                   answers=load_cli_answers(args), answer_min_freq=args.answer_min_freq,
+                                   shortlist=args.shortlist, objective=args.objective, hard_mode=args.hard)
+            first_guess = args.first_guess or (solver.precomputed_first_guess or (None,))[0]
+            if args.stage == 'second' and not first_guess:
+                print("No first guess cached; run the first stage (or pass --first-guess) before the second")
+                sys.exit(1)
+            count = coordinate_precompute(solver, args.queue, args.stage, args.unit_size, first_guess)
+            print(f"Wrote {p.no('work unit', count)} for the {args.stage} stage to {args.queue}")
+        else:
+            print_banner(word_length(load_wordlist(args.wordlist)))
+            solver = EntropySolver(wordlist_file=args.wordlist, cache_file=args.cache, metrics=metrics,
+                                   answers=load_cli_answers(args), answer_min_freq=args.answer_min_freq,
+                                   workers=args.workers, shared_backend=args.shared_backend,
+                                   feedback_matrix=args.feedback_matrix, search_budget=args.search_budget,
+                                   shortlist=args.shortlist, lookahead=args.lookahead,
+                                   objective=args.objective, checkpoint_interval=args.checkpoint_interval,
+                                   memory_budget=args.memory_budget, hard_mode=args.hard,
+                                   threads=args.threads)
+            if args.memory_report:
+                solver.memory_report = MemoryReport(solver).start()
+            if args.boards > 1:
+                MultiBoardSolver(solver, args.boards, args.board_objective).run()
+            else:
+                solver.run()
+    finally:
+        metrics.close()
\ No newline at end of file
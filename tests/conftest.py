@@ -0,0 +1,51 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def repo_cwd(monkeypatch):
+    """Run from the repository root so freq.csv is found as in normal use"""
+    monkeypatch.chdir(ROOT)
+
+
+@pytest.fixture(scope='session')
+def wordlist():
+    return main.load_wordlist(os.path.join(ROOT, "wordlist.ts"))
+
+
+@pytest.fixture(scope='session')
+def words(wordlist):
+    """A seeded 200-word sample of the bundled list"""
+    return main.sample_words(wordlist, 200, seed=1)
+
+
+def write_wordlist(path, words):
+    """Write words as a wordlist.ts-style export"""
+    body = "".join(f"'{word}',\n" for word in words)
+    path.write_text(f"export const VALID_GUESSES = [\n{body}]\n", encoding='utf-8')
+    return str(path)
+
+
+def make_solver(words, **kwargs):
+    kwargs.setdefault('cache_file', None)
+    kwargs.setdefault('progress', [])
+    return main.EntropySolver(words=words, **kwargs)
+
+
+def random_histories(solver, count, seed=0):
+    """Feedback histories of random two-guess games"""
+    rng = random.Random(seed)
+    histories = []
+    for _ in range(count):
+        answer = rng.choice(solver.answer_list)
+        guesses = rng.sample(solver.full_list, 2)
+        histories.append([(guess, main.get_feedback(guess, answer)) for guess in guesses])
+    return histories
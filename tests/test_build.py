@@ -0,0 +1,72 @@
+import json
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import main
+from conftest import ROOT, make_solver, write_wordlist
+
+pytestmark = pytest.mark.skipif(main.np is None, reason="the build stages need NumPy")
+
+
+def build(tmp_path, wordlist, *options, build_args=()):
+    """Run `main.py build` in a fresh process, returns {stage: 'built' or 'up to date'}"""
+    command = [sys.executable, os.path.join(ROOT, "main.py"), '--wordlist', wordlist,
+               '--cache', str(tmp_path / "cache.pkl"), *options,
+               'build', '--build-dir', str(tmp_path / "build"), *build_args]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, encoding='utf-8')
+    assert result.returncode == 0, result.stderr
+    return {name: state for name, state in re.findall(r"^  (\w+): (built|up to date)", result.stdout, re.M)}
+
+
+@pytest.fixture
+def build_words(wordlist):
+    """A small list with a kana (ヴ) that is only given a code at run time"""
+    return main.sample_words(wordlist, 120, seed=3) + ['ヴぃらん']
+
+
+def test_rebuilds_only_changed_stages(tmp_path, build_words):
+    wordlist = write_wordlist(tmp_path / "words.ts", build_words)
+    first = build(tmp_path, wordlist)
+    assert set(first.values()) == {'built'}
+    assert set(build(tmp_path, wordlist).values()) == {'up to date'}
+    
+    # Another objective keeps the word bundle
+    changed = build(tmp_path, wordlist, '--objective', 'minimax')
+    assert changed['bundle'] == 'up to date' and changed['openers'] == 'built'
+    
+    # An edited word list rebuilds from the bundle down
+    write_wordlist(tmp_path / "words.ts", build_words[:-2] + build_words[-1:])
+    assert set(build(tmp_path, wordlist, '--objective', 'minimax').values()) == {'built'}
+    
+    # A replaced cache file is installed again, nothing else is rebuilt
+    os.remove(tmp_path / "cache.pkl")
+    again = build(tmp_path, wordlist, '--objective', 'minimax')
+    assert again.pop('cache') == 'built' and set(again.values()) == {'up to date'}
+
+
+def test_matrix_build_in_new_process(tmp_path, build_words):
+    """The stored bundle codes stay valid in processes that never saw its run-time kana"""
+    wordlist = write_wordlist(tmp_path / "words.ts", build_words)
+    build(tmp_path, wordlist)
+    stages = build(tmp_path, wordlist, '--workers', '2', '--feedback-matrix',
+                   build_args=('--include', 'hard', 'pairs', '--jobs', '2'))
+    assert stages['bundle'] == 'up to date'
+    assert stages['matrix'] == 'built' and stages['pairs'] == 'built'
+    with open(tmp_path / "build" / "manifest.json", encoding='utf-8') as f:
+        assert set(json.load(f)) >= {'bundle', 'matrix', 'openers', 'second', 'hard_openers', 'pairs', 'cache'}
+
+
+def test_installed_cache_matches_direct_precompute(tmp_path, build_words):
+    wordlist = write_wordlist(tmp_path / "words.ts", build_words)
+    build(tmp_path, wordlist, build_args=('--include', 'pairs'))
+    direct = make_solver(build_words)
+    direct.precompute_first_guess()
+    installed = main.EntropySolver(wordlist_file=wordlist, cache_file=str(tmp_path / "cache.pkl"), progress=[])
+    assert installed.precomputed_first_guess == direct.precomputed_first_guess
+    assert installed.precomputed_second_guesses == direct.precomputed_second_guesses
+    assert installed.opener_pairs['pairs']
+    assert not installed.sync_wordlist()
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+import main
+from conftest import make_solver
+
+
+def interrupt_after(scan, count):
+    """Wrap an opener_histograms method so the scan stops like ^C after count guesses"""
+    def histograms(first=0):
+        for done, item in enumerate(scan(first)):
+            if done == count:
+                raise KeyboardInterrupt
+            yield item
+    return histograms
+
+
+def test_interrupted_opener_scan_resumes(tmp_path, words):
+    cache = str(tmp_path / "solver_cache.pkl")
+    expected = make_solver(words).find_best_opener()
+    
+    interrupted = make_solver(words, cache_file=cache)
+    interrupted.opener_histograms = interrupt_after(interrupted.opener_histograms, 70)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.find_best_opener()
+    assert len(interrupted.load_checkpoint()[0]) == 70
+    
+    events = []
+    resumed = make_solver(words, cache_file=cache, progress=[lambda event, fields: events.append((event, fields))])
+    assert resumed.find_best_opener() == expected
+    assert [fields['processed'] for event, fields in events if event == 'first_guess_resumed'] == [70]
+    assert resumed.metrics.counters['guesses_evaluated'] == len(words) - 70
+    assert not os.path.exists(resumed.checkpoint_file)
+
+
+def test_journal_for_other_words_is_ignored(tmp_path, words):
+    cache = str(tmp_path / "solver_cache.pkl")
+    interrupted = make_solver(words, cache_file=cache)
+    interrupted.opener_histograms = interrupt_after(interrupted.opener_histograms, 30)
+    with pytest.raises(KeyboardInterrupt):
+        interrupted.find_best_opener()
+    assert make_solver(words[:-1], cache_file=cache).load_checkpoint() == ([], [])
+    assert make_solver(words, cache_file=cache, objective='minimax').load_checkpoint() == ([], [])
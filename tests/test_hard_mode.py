@@ -0,0 +1,46 @@
+import pytest
+
+import main
+from conftest import make_solver
+
+
+@pytest.fixture(scope='module')
+def hard_solver(words):
+    solver = make_solver(words, answers=words[::2], hard_mode=True)
+    solver.precompute_first_guess()
+    return solver
+
+
+def test_guesses_fit_the_feedback_so_far(hard_solver):
+    solver = hard_solver
+    first_guess = solver.precomputed_first_guess[0]
+    assert first_guess in solver.answer_list
+    solver.precompute_second_guesses(first_guess)
+    for feedback, (guess, _) in solver.precomputed_second_guesses.items():
+        assert solver.fits_history(guess, [(first_guess, feedback)])
+    
+    for answer in solver.answer_list[::10]:
+        guesses = solver.simulate_game(answer)
+        assert guesses[-1] == answer
+        history = []
+        for guess in guesses:
+            assert guess in solver.answer_list and solver.fits_history(guess, history)
+            history.append((guess, main.get_feedback(guess, answer)))
+
+
+def test_search_only_scores_candidates(hard_solver):
+    candidates = hard_solver.answer_indices[:30]
+    assert list(hard_solver.select_guesses(candidates, 10)) == list(candidates)
+    assert hard_solver.find_best_guess(candidates)[0] in hard_solver.candidate_words(candidates)
+
+
+def test_batch_rejects_guesses_that_break_hard_mode(hard_solver):
+    solver = hard_solver
+    answer, first_guess = solver.answer_list[0], solver.precomputed_first_guess[0]
+    feedback = main.get_feedback(first_guess, answer)
+    history = [[first_guess, "".join(map(str, feedback))]]
+    misfit = next(word for word in solver.full_list if not solver.fits_history(word, [(first_guess, feedback)]))
+    recommender = main.BatchRecommender(solver)
+    assert recommender.parse_history(history)
+    with pytest.raises(ValueError, match="hard mode"):
+        recommender.parse_history(history + [[misfit, "0" * solver.word_length]])
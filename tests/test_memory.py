@@ -0,0 +1,26 @@
+import main
+from conftest import make_solver
+
+
+def test_feedback_lru_sized_per_solver(words):
+    budgeted = make_solver(words, memory_budget=1)
+    default = make_solver(words)
+    assert budgeted.get_feedback_cached.cache_parameters()['maxsize'] == budgeted.memory_plan['lru_entries']
+    assert default.get_feedback_cached.cache_parameters()['maxsize'] == main.FEEDBACK_LRU_ENTRIES
+    
+    # Filling one solver's LRU leaves the other's alone
+    for answer in words:
+        budgeted.get_feedback_cached(words[0], answer)
+    assert budgeted.get_feedback_cached.cache_info().currsize == len(words)
+    assert default.get_feedback_cached.cache_info().currsize == 0
+
+
+def test_snapshot_and_report_read_the_solver_lru(words):
+    solver = make_solver(words, memory_budget=1)
+    solver.find_best_guess(solver.answer_indices[:40])
+    info = solver.get_feedback_cached.cache_info()
+    snapshot = solver.metrics.snapshot()
+    assert snapshot['counters']['feedback_lru_misses'] == info.misses > 0
+    assert snapshot['gauges']['feedback_lru_size'] == info.currsize
+    report = main.MemoryReport(solver)
+    assert report.components()['feedback LRU'] == info.currsize * main.LRU_ENTRY_BYTES
@@ -0,0 +1,18 @@
+import main
+
+
+def test_prometheus_counters_end_in_total(tmp_path):
+    path = str(tmp_path / "solver.prom")
+    metrics = main.Metrics([main.PrometheusTextfileSink(path)])
+    metrics.incr('guesses_evaluated', 3)
+    metrics.set_gauge('candidates', 7)
+    metrics.observe('round_seconds', 0.5)
+    metrics.flush()
+    lines = open(path, encoding='utf-8').read().splitlines()
+    assert "# TYPE kotobade_solver_guesses_evaluated_total counter" in lines
+    assert "kotobade_solver_guesses_evaluated_total 3" in lines
+    assert "kotobade_solver_candidates 7" in lines
+    assert "kotobade_solver_round_seconds_count 1" in lines
+    # Every counter sample, including the cache statistics, has the suffix
+    counters = [line.split()[2] for line in lines if line.endswith(" counter")]
+    assert counters and all(name.endswith("_total") for name in counters)
@@ -0,0 +1,51 @@
+import argparse
+from collections import Counter
+
+import pytest
+
+import main
+from conftest import make_solver
+
+
+def test_histogram_scores():
+    scores = main.histogram_scores([4, 1, 2, 1], ('entropy', 'minimax', 'expected_remaining', 'solve_next'))
+    assert scores == pytest.approx((1.75, -4, -2.75, 0.25))
+    # Frequency-weighted entropy only looks at the prior masses of the groups
+    assert main.histogram_scores([3, 1], ('freq_entropy',), [0.5, 0.5]) == pytest.approx((1.0,))
+    with pytest.raises(ValueError):
+        main.histogram_scores([1, 1], ('fastest',))
+
+
+def test_parse_objectives():
+    assert main.parse_objectives("minimax, entropy") == "minimax,entropy"
+    with pytest.raises(argparse.ArgumentTypeError):
+        main.parse_objectives("entropy,fastest")
+
+
+@pytest.mark.parametrize('objective', ['entropy', 'minimax', 'expected_remaining', 'solve_next'])
+def test_search_maximises_the_objective(words, objective):
+    solver = make_solver(words, objective=objective, search_budget=0)
+    candidates = solver.answer_indices[:60]
+    answers = solver.candidate_words(candidates)
+    best = max(main.histogram_scores(Counter(main.get_feedback(guess, answer) for answer in answers).values(),
+                                     (objective,))[0]
+               for guess in solver.full_list)
+    assert solver.find_best_guess(candidates)[1] == pytest.approx(best)
+
+
+def test_block_engine_matches_python_for_every_objective(words, monkeypatch):
+    if main.np is None:
+        pytest.skip("the block engine needs NumPy")
+    objectives = list(main.OBJECTIVES)
+    candidates = make_solver(words).answer_indices[:80]
+    results = []
+    for pairs in (10 ** 12, 1):
+        monkeypatch.setattr(main, 'BLOCK_SEARCH_PAIRS', pairs)
+        solver = make_solver(words, objective=objectives, search_budget=0)
+        results.append((solver.find_best_guess(candidates), solver.round_engine, solver.last_scores))
+    (python_guess, python_engine, python_scores), (block_guess, block_engine, block_scores) = results
+    assert (python_engine, block_engine) == ('python', 'block')
+    assert block_guess == python_guess
+    assert block_scores.keys() == python_scores.keys()
+    for guess, scores in python_scores.items():
+        assert block_scores[guess] == pytest.approx(scores)
@@ -0,0 +1,61 @@
+import pytest
+
+import main
+from conftest import make_solver
+
+pytestmark = pytest.mark.skipif(main.np is None, reason="worker processes need NumPy")
+
+
+@pytest.fixture(scope='module')
+def kana_words(wordlist):
+    """A sample with the list's ゔ and 〜 words, plus a kana only registered at run time"""
+    special = [word for word in wordlist if 'ゔ' in word or '〜' in word]
+    return main.sample_words(wordlist, 120, seed=2) + special[:10] + ['ヴぃらん']
+
+
+@pytest.fixture(scope='module')
+def reference(kana_words):
+    solver = make_solver(kana_words)
+    first_guess = solver.precompute_first_guess()
+    return first_guess, solver.precomputed_second_guesses, solver.guess_histograms
+
+
+@pytest.mark.parametrize('backend,matrix', [('shm', False), ('shm', True), ('mmap', False), ('mmap', True)])
+def test_workers_match_single_process(kana_words, reference, backend, matrix):
+    solver = make_solver(kana_words, workers=2, shared_backend=backend, feedback_matrix=matrix)
+    try:
+        assert solver.precompute_first_guess() == reference[0]
+        assert solver.guess_histograms == reference[2]
+        second = solver.precomputed_second_guesses
+        assert second.keys() == reference[1].keys()
+        for feedback, (guess, gain) in reference[1].items():
+            assert second[feedback][0] == guess
+            assert second[feedback][1] == pytest.approx(gain, abs=1e-9)
+    finally:
+        solver.release_tables()
+
+
+def test_workers_register_published_kana(kana_words):
+    solver = make_solver(kana_words)
+    tables = solver.publish_tables()
+    try:
+        alphabet = tables.arrays['kana_alphabet'].tolist()
+        assert 'ヴ' in alphabet and alphabet == main.KANA_ALPHABET[:len(alphabet)]
+        main.register_kana(alphabet)
+        with pytest.raises(ValueError):
+            main.register_kana(list(reversed(alphabet)))
+    finally:
+        solver.release_tables()
+
+
+def test_shared_tables_published_once(kana_words):
+    solver = make_solver(kana_words, workers=2, feedback_matrix=True)
+    builds = []
+    build = solver.build_feedback_matrix
+    solver.build_feedback_matrix = lambda *args: builds.append(1) or build(*args)
+    try:
+        solver.precompute_first_guess()
+        assert len(builds) == 1
+    finally:
+        solver.release_tables()
+    assert solver.shared_tables is None and solver.table_bytes == {}
@@ -0,0 +1,50 @@
+import os
+import time
+
+import pytest
+
+import main
+from conftest import make_solver
+
+
+def drain(solver, queue_dir, stage, unit_size, first_guess=None):
+    assert main.coordinate_precompute(solver, queue_dir, stage, unit_size, first_guess) > 1
+    main.run_worker(queue_dir, main.Metrics(), poll=0)
+    assert main.merge_results(solver, queue_dir)
+
+
+def test_work_queue_matches_sequential_precompute(tmp_path, words):
+    sample = words[:120]
+    queue_dir = str(tmp_path / "queue")
+    queued = make_solver(sample)
+    drain(queued, queue_dir, 'first', 25)
+    
+    sequential = make_solver(sample)
+    sequential.precomputed_first_guess = sequential.find_best_opener()
+    assert queued.precomputed_first_guess[0] == sequential.precomputed_first_guess[0]
+    assert queued.precomputed_first_guess[1] == pytest.approx(sequential.precomputed_first_guess[1])
+    
+    first_guess = sequential.precomputed_first_guess[0]
+    drain(queued, queue_dir, 'second', 20, first_guess)
+    sequential.precompute_second_guesses(first_guess)
+    expected = sequential.precomputed_second_guesses
+    assert queued.precomputed_second_guesses.keys() == expected.keys()
+    for feedback, (guess, gain) in expected.items():
+        assert queued.precomputed_second_guesses[feedback][0] == guess
+        assert queued.precomputed_second_guesses[feedback][1] == pytest.approx(gain)
+
+
+def test_stale_claims_are_requeued(tmp_path, words):
+    queue_dir = str(tmp_path / "queue")
+    main.coordinate_precompute(make_solver(words[:60]), queue_dir, 'first', 20)
+    queue = main.WorkQueue(queue_dir, lease=60)
+    unit, claim_path = queue.claim()
+    assert queue.status() == (2, 1, 0)
+    assert queue.requeue_stale() == 0
+    
+    # A claim whose heartbeat stopped goes back to pending under its own name
+    stale = time.time() - 120
+    os.utime(claim_path, (stale, stale))
+    assert queue.requeue_stale() == 1
+    assert queue.status() == (3, 0, 0)
+    assert unit['name'] in os.listdir(queue.pending)
@@ -0,0 +1,37 @@
+import pytest
+
+import main
+from conftest import make_solver
+
+
+def least_informative(solver, candidates):
+    """Candidates left after the guess and feedback that remove the fewest of them, but some"""
+    best = None
+    for guess in solver.full_list:
+        groups = {}
+        for idx in candidates.tolist():
+            groups.setdefault(main.get_feedback(guess, solver.full_list[idx]), []).append(idx)
+        for feedback, group in groups.items():
+            if len(group) < len(candidates) and (best is None or len(group) > len(best[2])):
+                best = (guess, feedback, group)
+    return solver.filter_candidates(best[0], best[1], candidates)
+
+
+@pytest.mark.parametrize('size,engine', [(150, 'python'), (600, 'block')])
+def test_histograms_decremented_across_rounds(wordlist, size, engine):
+    if engine == 'block' and main.np is None:
+        pytest.skip("the block engine needs NumPy")
+    words = main.sample_words(wordlist, size, seed=4)
+    solver = make_solver(words, search_budget=0)
+    candidates = solver.answer_indices
+    decremented = []
+    for _ in range(3):
+        guess, gain = solver.find_best_guess(candidates)
+        assert solver.round_engine == engine
+        decremented.append(solver.metrics.counters['histograms_decremented'])
+        # Searching without the previous round's histograms gives the same result
+        fresh = make_solver(words, search_budget=0)
+        assert fresh.find_best_guess(candidates) == (guess, gain)
+        assert fresh.last_scores == solver.last_scores
+        candidates = least_informative(solver, candidates)
+    assert decremented[0] == 0 < decremented[1] < decremented[2]
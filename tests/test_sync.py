@@ -0,0 +1,34 @@
+import pytest
+
+import main
+from conftest import write_wordlist
+
+
+@pytest.mark.parametrize('numpy', [True, False])
+def test_sync_matches_full_recompute(tmp_path, monkeypatch, wordlist, numpy):
+    if not numpy:
+        monkeypatch.setattr(main, 'np', None)
+    base = main.sample_words(wordlist, 150, seed=1)
+    added = [word for word in main.sample_words(wordlist, 200, seed=9) if word not in base][:5]
+    path = tmp_path / "wordlist.ts"
+    cache = str(tmp_path / "solver_cache.pkl")
+    write_wordlist(path, base)
+    main.EntropySolver(wordlist_file=str(path), cache_file=cache, progress=[]).prepare_openers()
+    
+    # Drop a few words and add a few, then let the cached solver catch up
+    write_wordlist(path, base[:-4] + added)
+    synced = main.EntropySolver(wordlist_file=str(path), cache_file=cache, progress=[])
+    assert synced.sync_wordlist()
+    synced.precompute_second_guesses(synced.precomputed_first_guess[0])
+    
+    full = main.EntropySolver(wordlist_file=str(path), cache_file=None, progress=[])
+    full.precomputed_first_guess = full.find_best_opener()
+    full.precompute_second_guesses(full.precomputed_first_guess[0])
+    
+    assert synced.precomputed_first_guess[0] == full.precomputed_first_guess[0]
+    assert synced.precomputed_first_guess[1] == pytest.approx(full.precomputed_first_guess[1])
+    second, expected = synced.precomputed_second_guesses, full.precomputed_second_guesses
+    assert second.keys() == expected.keys()
+    for feedback, (guess, gain) in expected.items():
+        assert second[feedback][0] == guess
+        assert second[feedback][1] == pytest.approx(gain)